@@ -1,18 +1,123 @@
 # -*- coding: utf-8 -*-
 
-# Пересечение и две разности двух множеств за один проход
+# Пересечение и две разности двух множеств за один проход.
+#
+# Способы вычисления (engine):
+#  sort   — множества сортируются и сравниваются за один проход,
+#  sorted — данные уже отсортированы, сортировки нет,
+#  numpy  — сортировка и searchsorted numpy для чисел или строк,
+#  hash   — только хеширование, для элементов без порядка,
+#  auto   — выбор по типу и размеру данных.
+#
+# Для данных больше памяти — streaming_intersection_and_difference
+# с внешней сортировкой во временных файлах.
+#
+# intersection_and_difference.py stream file_a file_b intersection_file a_only_file b_only_file [run_size]
 
 import sys
+import os
+import bisect
+import heapq
+import itertools
+import operator
+import pickle
 import random
+import tempfile
 import unittest
+import numpy as np
 
 if sys.version_info < (3, 6):
         sys.exit("Python >= 3.6 is required.")
 
-def intersection_and_difference(data_a, data_b):
+ENGINES = ("auto", "sort", "sorted", "numpy", "hash")
 
-        set_a = sorted(set(data_a))
-        set_b = sorted(set(data_b))
+# Наименьшее общее количество элементов списков, при котором
+# списки целых чисел преобразуются в массивы numpy
+NUMPY_MIN_SIZE = 10000
+
+# Во сколько раз одно множество должно быть больше другого,
+# чтобы большее множество проходилось не по одному элементу,
+# а экспоненциальным и двоичным поиском
+GALLOP_RATIO = 8
+
+# Наибольшее количество элементов, сортируемых в памяти при внешней
+# сортировке. Память при внешней сортировке ограничена примерно
+# этим количеством элементов для обеих последовательностей вместе.
+STREAM_RUN_SIZE = 1000000
+
+# Наибольшее количество файлов, объединяемых за один раз
+STREAM_MAX_MERGE_FILES = 64
+
+# Количество элементов, записываемых и читаемых одним блоком
+STREAM_BLOCK_SIZE = 1024
+
+class IntersectionAndDifferenceException(Exception):
+        pass
+
+def error(message):
+        raise IntersectionAndDifferenceException(message)
+
+# Итерируемый объект по отсортированным элементам без повторов
+def skip_repeats(elements):
+
+        return map(operator.itemgetter(0), itertools.groupby(elements))
+
+# Списки small и large отсортированы, small намного меньше large.
+# Для каждого элемента small в large ищется первый не меньший элемент
+# экспоненциальным поиском от предыдущего найденного места и двоичным
+# поиском, пропущенные элементы large копируются в разность сразу.
+# Время O(m log(n/m)) без учёта копирования разности. Если списки
+# могут иметь повторы, то unique равно False.
+def galloping_intersection_and_difference(small, large, unique = True):
+
+        intersection = []
+        difference_small = []
+        difference_large = []
+
+        if unique:
+                copy = lambda elements: elements
+        else:
+                small = skip_repeats(small)
+                copy = skip_repeats
+
+        n = len(large)
+        position = 0
+
+        for x in small:
+
+                bound = 1
+                while position + bound < n and large[position + bound] < x:
+                        bound *= 2
+
+                found = bisect.bisect_left(large, x, position + bound // 2, min(position + bound + 1, n))
+
+                difference_large.extend(copy(large[position:found]))
+
+                if found < n and not x < large[found]:
+                        intersection.append(x)
+                        position = found + 1 if unique else bisect.bisect_right(large, x, found + 1)
+                else:
+                        difference_small.append(x)
+                        position = found
+
+        difference_large.extend(copy(large[position:]))
+
+        return intersection, difference_small, difference_large
+
+# Списки set_a и set_b отсортированы. Если списки могут иметь
+# повторы, то unique равно False.
+def sorted_intersection_and_difference(set_a, set_b, unique = True):
+
+        if len(set_a) * GALLOP_RATIO < len(set_b):
+                return galloping_intersection_and_difference(set_a, set_b, unique)
+
+        if len(set_b) * GALLOP_RATIO < len(set_a):
+                intersection, difference_b, difference_a = galloping_intersection_and_difference(set_b, set_a, unique)
+                return intersection, difference_a, difference_b
+
+        if not unique:
+                set_a = list(skip_repeats(set_a))
+                set_b = list(skip_repeats(set_b))
 
         intersection = []
         difference_a = []
@@ -41,8 +146,353 @@ def intersection_and_difference(data_a, data_b):
 
         return intersection, difference_a, difference_b
 
+def sort_intersection_and_difference(data_a, data_b):
+
+        return sorted_intersection_and_difference(sorted(set(data_a)), sorted(set(data_b)))
+
+# Отсортированные элементы массива без повторов. Вместо np.unique,
+# так как np.unique в новых версиях numpy использует хеширование
+# и для больших массивов намного медленнее сортировки.
+def sorted_unique(array):
+
+        array = np.sort(array, axis = None)
+
+        if len(array) == 0:
+                return array
+
+        different = array[1:] != array[:-1]
+
+        # Все NaN, которые np.sort ставит в конец, считаются одним элементом
+        if array.dtype.kind in "fc":
+                nan = np.isnan(array)
+                different &= ~(nan[1:] & nan[:-1])
+
+        return array[np.concatenate(([True], different))]
+
+# Массивы numpy set_a и set_b отсортированы и не имеют повторов
+def numpy_sorted_intersection_and_difference(set_a, set_b):
+
+        # Элементы set_a, найденные в set_b
+        found_a = np.zeros(len(set_a), dtype = bool)
+        if len(set_a) > 0 and len(set_b) > 0:
+                indices = np.searchsorted(set_b, set_a)
+                in_range = indices < len(set_b)
+                found_b = set_b[indices[in_range]]
+                found_a[in_range] = found_b == set_a[in_range]
+                if set_a.dtype.kind in "fc" and set_b.dtype.kind in "fc":
+                        found_a[in_range] |= np.isnan(found_b) & np.isnan(set_a[in_range])
+
+        intersection = set_a[found_a]
+        difference_a = set_a[~found_a]
+
+        # Остальные элементы set_b
+        found_b = np.ones(len(set_b), dtype = bool)
+        found_b[np.searchsorted(set_b, intersection)] = False
+        difference_b = set_b[found_b]
+
+        return intersection, difference_a, difference_b
+
+# Вид элементов массива numpy. Целые числа и числа с плавающей
+# точкой сравниваются numpy так же, как в Python, поэтому имеют
+# один вид.
+def array_kind(array):
+
+        kind = array.dtype.kind
+        return "f" if kind in "iuf" else kind
+
+# Данные в виде массивов numpy. При преобразовании списков с элементами
+# разных типов numpy изменяет элементы, например, числа среди строк
+# становятся строками, поэтому такие данные не допускаются.
+def numpy_arrays(data_a, data_b):
+
+        arrays = (np.asarray(data_a), np.asarray(data_b))
+
+        for data, array in zip((data_a, data_b), arrays):
+                if array.dtype.kind == "O":
+                        error("Data type {0} is not supported by numpy engine".format(array.dtype))
+                if array.dtype.kind in "US" and not isinstance(data, np.ndarray):
+                        element_type = str if array.dtype.kind == "U" else bytes
+                        if not all(isinstance(x, element_type) for x in data):
+                                error("Data with strings and other types are not supported by numpy engine")
+
+        if arrays[0].size > 0 and arrays[1].size > 0 and array_kind(arrays[0]) != array_kind(arrays[1]):
+                error("Data types {0} and {1} are not supported together by numpy engine".format(
+                        arrays[0].dtype, arrays[1].dtype))
+
+        return arrays
+
+# Результат в виде массивов numpy, если хотя бы одни данные
+# являются массивом numpy, иначе в виде списков
+def numpy_intersection_and_difference(data_a, data_b):
+
+        result = numpy_sorted_intersection_and_difference(*(sorted_unique(a) for a in numpy_arrays(data_a, data_b)))
+
+        if isinstance(data_a, np.ndarray) or isinstance(data_b, np.ndarray):
+                return result
+
+        return tuple(r.tolist() for r in result)
+
+# Элементы результата в порядке первого появления в данных
+def hash_intersection_and_difference(data_a, data_b):
+
+        set_a = dict.fromkeys(data_a)
+        set_b = dict.fromkeys(data_b)
+
+        intersection = [x for x in set_a if x in set_b]
+        difference_a = [x for x in set_a if x not in set_b]
+        difference_b = [x for x in set_b if x not in set_a]
+
+        return intersection, difference_a, difference_b
+
+# Большие списки целых чисел в виде массивов numpy. Другие данные
+# не преобразуются, так как при преобразовании изменяются элементы:
+# целые числа среди чисел с плавающей точкой становятся числами
+# с плавающей точкой, а числа среди строк становятся строками.
+def integer_arrays(data_a, data_b):
+
+        if len(data_a) + len(data_b) < NUMPY_MIN_SIZE:
+                return None
+
+        try:
+                arrays = (np.asarray(data_a), np.asarray(data_b))
+        except (OverflowError, TypeError, ValueError):
+                return None
+
+        for array in arrays:
+                if array.ndim != 1 or (len(array) > 0 and array.dtype.kind not in "iu"):
+                        return None
+
+        return arrays
+
+def intersection_and_difference(data_a, data_b, engine = "auto"):
+
+        if engine not in ENGINES:
+                error("Unknown engine \"{0}\"".format(engine))
+
+        if engine == "sort":
+                return sort_intersection_and_difference(data_a, data_b)
+
+        if engine == "sorted":
+                return sorted_intersection_and_difference(data_a, data_b, unique = False)
+
+        if engine == "numpy":
+                return numpy_intersection_and_difference(data_a, data_b)
+
+        if engine == "hash":
+                return hash_intersection_and_difference(data_a, data_b)
+
+        if not hasattr(data_a, "__getitem__"):
+                data_a = list(data_a)
+        if not hasattr(data_b, "__getitem__"):
+                data_b = list(data_b)
+
+        if isinstance(data_a, np.ndarray) or isinstance(data_b, np.ndarray):
+                try:
+                        return numpy_intersection_and_difference(data_a, data_b)
+                except (IntersectionAndDifferenceException, TypeError):
+                        pass
+        else:
+                arrays = integer_arrays(data_a, data_b)
+                if arrays is not None:
+                        result = numpy_sorted_intersection_and_difference(*(sorted_unique(a) for a in arrays))
+                        return tuple(r.tolist() for r in result)
+
+        try:
+                return sort_intersection_and_difference(data_a, data_b)
+        except TypeError:
+                # Элементы без порядка
+                return hash_intersection_and_difference(data_a, data_b)
+
+# Запись отсортированных элементов в файл блоками по STREAM_BLOCK_SIZE
+def write_run(directory, elements):
+
+        with tempfile.NamedTemporaryFile("wb", dir = directory, suffix = ".run", delete = False) as f:
+                block = []
+                for element in elements:
+                        block.append(element)
+                        if len(block) == STREAM_BLOCK_SIZE:
+                                pickle.dump(block, f, pickle.HIGHEST_PROTOCOL)
+                                block = []
+                if len(block) > 0:
+                        pickle.dump(block, f, pickle.HIGHEST_PROTOCOL)
+                return f.name
+
+# Элементы файла по одному, в памяти только один блок
+def read_run(file_name):
+
+        with open(file_name, "rb") as f:
+                while True:
+                        try:
+                                block = pickle.load(f)
+                        except EOFError:
+                                break
+                        yield from block
+
+# Объединение отсортированных последовательностей без повторов
+def merge_unique(iterables):
+
+        end = object()
+        previous = end
+
+        for element in heapq.merge(*iterables):
+                if previous is end or previous < element:
+                        yield element
+                        previous = element
+
+# Отсортированные элементы без повторов. Данные читаются частями
+# по run_size элементов, части сортируются и записываются в файлы
+# в directory, файлы объединяются по max_merge_files. Удалять файлы
+# в directory должна вызывающая функция. Если in_memory, то данные
+# не больше run_size элементов не записываются в файл, а остаются
+# в памяти до конца чтения результата.
+def external_sorted_unique(data, directory, run_size = STREAM_RUN_SIZE, max_merge_files = STREAM_MAX_MERGE_FILES,
+                           in_memory = True):
+
+        if run_size <= 0:
+                error("Run size must be positive")
+
+        if max_merge_files < 2:
+                error("Merge file count must be at least 2")
+
+        runs = []
+        run = []
+
+        for element in data:
+                run.append(element)
+                if len(run) == run_size:
+                        runs.append(write_run(directory, sorted(set(run))))
+                        run = []
+
+        # Все данные в памяти
+        if len(runs) == 0 and (in_memory or len(run) == 0):
+                yield from sorted(set(run))
+                return
+
+        if len(run) > 0:
+                runs.append(write_run(directory, sorted(set(run))))
+        del run
+
+        while len(runs) > max_merge_files:
+                group, runs = runs[:max_merge_files], runs[max_merge_files:]
+                runs.append(write_run(directory, merge_unique([read_run(r) for r in group])))
+                for r in group:
+                        os.remove(r)
+
+        yield from merge_unique([read_run(r) for r in runs])
+
+# Сравнение отсортированных последовательностей без повторов за один проход,
+# элементы передаются функциям intersection, difference_a и difference_b.
+# Возвращаемое значение — количество элементов для каждой функции.
+def merge_sorted_streams(stream_a, stream_b, intersection, difference_a, difference_b):
+
+        counts = [0, 0, 0]
+
+        end = object()
+
+        stream_a = iter(stream_a)
+        stream_b = iter(stream_b)
+
+        a = next(stream_a, end)
+        b = next(stream_b, end)
+
+        while a is not end and b is not end:
+                if a < b:
+                        difference_a(a)
+                        counts[1] += 1
+                        a = next(stream_a, end)
+                elif b < a:
+                        difference_b(b)
+                        counts[2] += 1
+                        b = next(stream_b, end)
+                else:
+                        intersection(a)
+                        counts[0] += 1
+                        a = next(stream_a, end)
+                        b = next(stream_b, end)
+
+        while a is not end:
+                difference_a(a)
+                counts[1] += 1
+                a = next(stream_a, end)
+
+        while b is not end:
+                difference_b(b)
+                counts[2] += 1
+                b = next(stream_b, end)
+
+        return tuple(counts)
+
+# Пересечение и две разности для данных больше памяти. data_a и data_b —
+# любые последовательности или итераторы сравнимых элементов, которые
+# можно записать с помощью pickle. Результат в порядке возрастания
+# передаётся по одному элементу функциям intersection, difference_a
+# и difference_b, например list.append или записи в файл. Значение None
+# вместо функции означает, что эти элементы не нужны. Временные файлы
+# создаются в directory или в каталоге временных файлов системы.
+def streaming_intersection_and_difference(data_a, data_b, intersection = None, difference_a = None,
+                                          difference_b = None, run_size = STREAM_RUN_SIZE,
+                                          max_merge_files = STREAM_MAX_MERGE_FILES, directory = None):
+
+        def sink(function):
+                return function if function is not None else (lambda element: None)
+
+        with tempfile.TemporaryDirectory(dir = directory) as temporary_directory:
+
+                # Объединяются обе последовательности, поэтому на каждую
+                # половина файлов
+                max_merge_files = max(2, max_merge_files // 2)
+
+                # Последовательность data_a читается из файлов, пока читается
+                # data_b, поэтому в памяти не больше run_size элементов
+                stream_a = external_sorted_unique(data_a, temporary_directory, run_size, max_merge_files,
+                                                  in_memory = False)
+                stream_b = external_sorted_unique(data_b, temporary_directory, run_size, max_merge_files)
+
+                return merge_sorted_streams(stream_a, stream_b, sink(intersection), sink(difference_a),
+                                            sink(difference_b))
+
+# Строки файла без символов конца строки
+def read_lines(file_name):
+
+        with open(file_name) as f:
+                for line in f:
+                        yield line.rstrip("\r\n")
+
+# Сравнение строк двух файлов, результаты записываются в три файла
+def stream_files(file_a, file_b, intersection_file, a_only_file, b_only_file, run_size = STREAM_RUN_SIZE,
+                 directory = None):
+
+        with open(intersection_file, "w") as intersection, open(a_only_file, "w") as a_only, \
+             open(b_only_file, "w") as b_only:
+
+                return streaming_intersection_and_difference(
+                        read_lines(file_a), read_lines(file_b),
+                        lambda line: intersection.write(line + "\n"),
+                        lambda line: a_only.write(line + "\n"),
+                        lambda line: b_only.write(line + "\n"),
+                        run_size = run_size, directory = directory)
+
+def run_stream(argv):
+
+        if len(argv) not in (5, 6):
+                error("Usage: stream file_a file_b intersection_file a_only_file b_only_file [run_size]")
+
+        run_size = STREAM_RUN_SIZE
+
+        if len(argv) == 6:
+                try:
+                        run_size = int(argv[5])
+                except ValueError:
+                        error("Error run size \"{0}\" conversion to integer".format(argv[5]))
+
+        counts = stream_files(*argv[:5], run_size = run_size)
+
+        print("intersection {0}, a only {1}, b only {2}".format(*counts))
+
 class IntersectionAndDifferenceTestCase(unittest.TestCase):
 
+        engine = "auto"
+
         @staticmethod
         def __error_string(text, data_a, data_b, result, set_result):
                 return "{0} failed.\n"\
@@ -54,7 +504,7 @@ class IntersectionAndDifferenceTestCase(unittest.TestCase):
 
         def __test_abc(self, data_a, data_b):
 
-                intersection, difference_a, difference_b = intersection_and_difference(data_a, data_b)
+                intersection, difference_a, difference_b = intersection_and_difference(data_a, data_b, self.engine)
 
                 self.assertTrue(len(intersection) == len(set(intersection)), "intersection elements are not unique")
                 self.assertTrue(len(difference_a) == len(set(difference_a)), "difference_a elements are not unique")
@@ -115,6 +565,145 @@ class IntersectionAndDifferenceTestCase(unittest.TestCase):
                                 self.__test(list_a, list_b)
                                 self.__test(tuple(list_a), tuple(list_b))
 
+        def test_engines(self):
+
+                for engine in ("sort", "numpy", "hash"):
+                        self.engine = engine
+                        self.test_intersection_and_difference()
+
+                data_a = random.sample(range(NUMPY_MIN_SIZE), NUMPY_MIN_SIZE // 2)
+                data_b = random.sample(range(NUMPY_MIN_SIZE), NUMPY_MIN_SIZE // 2)
+
+                result = intersection_and_difference(data_a, data_b, "sort")
+
+                self.assertEqual(intersection_and_difference(sorted(data_a), sorted(data_b), "sorted"), result)
+
+                for engine in ("auto", "numpy"):
+                        self.assertEqual(intersection_and_difference(data_a, data_b, engine), result)
+                        self.assertIsInstance(intersection_and_difference(data_a, data_b, engine)[0][0], int)
+
+                        arrays = intersection_and_difference(np.array(data_a), np.array(data_b), engine)
+                        for array, values in zip(arrays, result):
+                                self.assertIsInstance(array, np.ndarray)
+                                self.assertEqual(array.tolist(), values)
+
+                # Не преобразуются в массивы
+                self.assertEqual(intersection_and_difference(data_a + [0.5], data_b)[1],
+                                 sorted(set(data_a + [0.5]) - set(data_b)))
+                self.assertEqual(intersection_and_difference(data_a + ["1"], data_b + [1])[1][-1], "1")
+
+                # Элементы без порядка
+                self.assertEqual(intersection_and_difference([1, "a", (2,)], ["a", 3, None]),
+                                 (["a"], [1, (2,)], [3, None]))
+
+                # Числа среди строк не становятся строками
+                intersection, difference_a, difference_b = intersection_and_difference(np.array([1, 2, 3]), [2, "a"])
+                self.assertEqual(sorted(intersection), [2])
+                self.assertEqual(sorted(difference_a), [1, 3])
+                self.assertEqual(difference_b, ["a"])
+
+                with self.assertRaises(IntersectionAndDifferenceException):
+                        intersection_and_difference([1, "1"], [1], "numpy")
+                with self.assertRaises(IntersectionAndDifferenceException):
+                        intersection_and_difference(np.array([1, 2]), np.array(["1", "2"]), "numpy")
+
+                # Все NaN являются одним элементом
+                intersection, difference_a, difference_b = intersection_and_difference(
+                        np.array([np.nan, 1.0, np.nan]), np.array([np.nan, 2.0]), "numpy")
+                self.assertEqual(len(intersection), 1)
+                self.assertTrue(np.isnan(intersection[0]))
+                self.assertEqual(difference_a.tolist(), [1.0])
+                self.assertEqual(difference_b.tolist(), [2.0])
+
+                with self.assertRaises(IntersectionAndDifferenceException):
+                        intersection_and_difference([1], [2], "merge")
+
+        def test_galloping(self):
+
+                for large_size in (GALLOP_RATIO + 1, 100, 1000):
+                        for small_size in (0, 1, 2, large_size // GALLOP_RATIO - 1):
+
+                                large = sorted(random.sample(range(2 * large_size), large_size))
+                                small = sorted(random.sample(range(-10, 2 * large_size + 10), small_size))
+
+                                result = galloping_intersection_and_difference(small, large)
+
+                                set_small = set(small)
+                                set_large = set(large)
+                                self.assertEqual(result, (sorted(set_small & set_large), sorted(set_small - set_large),
+                                                          sorted(set_large - set_small)))
+
+                                self.assertEqual(intersection_and_difference(small, large, "sorted"), result)
+                                self.assertEqual(intersection_and_difference(large, small, "sorted"),
+                                                 (result[0], result[2], result[1]))
+
+                                # Повторы
+                                self.assertEqual(galloping_intersection_and_difference(
+                                        sorted(small + small), sorted(large + large[::3]), unique = False), result)
+                                self.assertEqual(intersection_and_difference(sorted(small * 2), sorted(large * 3), "sorted"),
+                                                 result)
+
+        def test_sorted_repeats(self):
+
+                self.assertEqual(intersection_and_difference([1, 1, 2], [1, 3], "sorted"), ([1], [2], [3]))
+                self.assertEqual(intersection_and_difference([1, 1, 2, 2, 5], [0, 0, 2, 2, 2, 5, 6], "sorted"),
+                                 ([2, 5], [1], [0, 6]))
+
+        def test_streaming(self):
+
+                for run_size, max_merge_files in ((1, 2), (7, 2), (7, 3), (100, 4), (STREAM_RUN_SIZE, 64)):
+
+                        data_a = [random.randrange(200) for i in range(300)]
+                        data_b = [random.randrange(200) for i in range(150)]
+
+                        result = ([], [], [])
+
+                        counts = streaming_intersection_and_difference(
+                                iter(data_a), data_b, result[0].append, result[1].append, result[2].append,
+                                run_size = run_size, max_merge_files = max_merge_files)
+
+                        self.assertEqual(result, intersection_and_difference(data_a, data_b, "sort"))
+                        self.assertEqual(counts, tuple(len(r) for r in result))
+
+                        self.assertEqual(streaming_intersection_and_difference(
+                                [], data_b, run_size = run_size, max_merge_files = max_merge_files),
+                                (0, 0, len(set(data_b))))
+
+                # Данные не больше run_size остаются в памяти только если in_memory
+                for in_memory, file_count in ((True, 0), (False, 1)):
+                        with tempfile.TemporaryDirectory() as directory:
+                                stream = external_sorted_unique([3, 1, 3, 2], directory, 10, in_memory = in_memory)
+                                self.assertEqual(next(stream), 1)
+                                self.assertEqual(len(os.listdir(directory)), file_count)
+                                self.assertEqual(list(stream), [2, 3])
+
+                with tempfile.TemporaryDirectory() as directory:
+
+                        names = [os.path.join(directory, name) for name in ("a", "b", "ab", "a_b", "b_a")]
+
+                        with open(names[0], "w") as f:
+                                f.write("3\n1\n2\n1\n")
+                        with open(names[1], "w") as f:
+                                f.write("4\r\n2\r\n")
+
+                        self.assertEqual(stream_files(*names, run_size = 2, directory = directory), (1, 2, 1))
+
+                        texts = []
+                        for name in names[2:]:
+                                with open(name) as f:
+                                        texts.append(f.read())
+
+                        self.assertEqual(texts, ["2\n", "1\n3\n", "4\n"])
+
+                        # Временные файлы удалены
+                        self.assertEqual(sorted(os.listdir(directory)), sorted(os.path.basename(n) for n in names))
+
 if __name__ == "__main__":
 
-        unittest.main()
+        if len(sys.argv) > 1 and sys.argv[1] == "stream":
+                try:
+                        run_stream(sys.argv[2:])
+                except Exception as e:
+                        sys.exit("{0}".format(e))
+        else:
+                unittest.main()
@@ -3,12 +3,31 @@
 
 # Прочитать треугольники из файла OBJ.
 # Рассчитать точки-семплы этих треугольников.
-# Записать точки в текстовый файл по одной на строку.
+# Записать точки в текстовый файл по одной на строку
+# или в двоичный файл.
 
 import sys
 import os
-import math
-import statistics
+import re
+import glob
+import json
+import io
+import time
+import contextlib
+import cProfile
+import pstats
+import tracemalloc
+import hashlib
+import zipfile
+import itertools
+import collections
+import concurrent.futures
+import operator
+import tempfile
+import threading
+import queue
+import unittest
+import unittest.mock
 import tkinter as tk
 from tkinter import ttk
 from tkinter import filedialog
@@ -17,12 +36,66 @@ import numpy as np
 import matplotlib.pyplot as plt
 
 
+# Размер фрагмента файла OBJ, читаемого и разбираемого за один раз
+OBJ_CHUNK_SIZE = 64 * 1024 * 1024
+
+# Строки "v ..." и "f ..." файла OBJ: тип строки и всё после него
+OBJ_RECORD_PATTERN = re.compile(rb"^[ \t]*(v|f)(?=\s|$)([^\n]*)", re.MULTILINE)
+
+# Всё после первого "/" в элементах "int/int/int" строки "f ..."
+OBJ_FACE_ELEMENT_SUFFIX_PATTERN = re.compile(rb"/\S*")
+
+# Строки "vt ...", "vn ..." и "f ..." файла OBJ для чтения атрибутов вершин
+OBJ_ATTRIBUTE_RECORD_PATTERN = re.compile(rb"^[ \t]*(vt|vn|f)(?=\s|$)([^\n]*)", re.MULTILINE)
+
+# Второе и третье числа элементов "int/int/int" по одному элементу на строке
+OBJ_FACE_ELEMENT_ATTRIBUTE_PATTERN = re.compile(rb"^[^/\n]*(?:/([^/\n]*))?(?:/([^/\n]*))?", re.MULTILINE)
+
+# Форматы файлов точек и их расширения. Текст — по точке на строку,
+# float32 и float64 — только числа x, y, z подряд, npy и npz — файлы NumPy
+# с массивом (N, 3), в npz со сжатием.
+SAMPLE_FILE_FORMATS = {"text": ".txt", "float32": ".f32", "float64": ".f64", "npy": ".npy", "npz": ".npz"}
+
+# Количество точек, записываемых в файл за один раз
+SAMPLE_BLOCK_SIZE = 1024 * 1024
+
+# Примерное количество точек в одной части треугольников при параллельном
+# вычислении. Не зависит от количества процессов, поэтому при одинаковом
+# начальном значении генератора случайных чисел файл получается одинаковым
+# при любом количестве процессов.
+SAMPLE_SHARD_SIZE = 1024 * 1024
+
+# Размер части файла при копировании файлов частей в файл точек
+SHARD_FILE_CHUNK_SIZE = 16 * 1024 * 1024
+
+SAMPLE_TEXT_FORMAT = "%9.6f %9.6f %9.6f\n"
+
+# Количество чисел в строке файла точек с атрибутами:
+# точка x y z, нормаль nx ny nz, текстурные координаты u v
+SAMPLE_ATTRIBUTE_COLUMNS = 8
+
+# Массивы атрибутов вершин ObjFile
+ATTRIBUTE_ARRAYS = ("normals", "face_normals", "texture_coordinates", "face_texture_coordinates")
+
+# Интервал проверки сообщений о ходе вычисления в окне программы, мс
+WINDOW_POLL_INTERVAL = 100
+
+# Процентили площадей треугольников в статистике
+AREA_PERCENTILES = (1, 5, 25, 50, 75, 95, 99)
+
+# Количество интервалов гистограммы площадей треугольников
+AREA_HISTOGRAM_BINS = 10
+
 if sys.version_info < (3, 6):
         sys.exit("Python >= 3.6 is required.")
 
 class ObjSamplesException(Exception):
         pass
 
+# Исключение функции progress для прекращения вычислений
+class ObjSamplesCancelled(ObjSamplesException):
+        pass
+
 def error(message):
         raise ObjSamplesException(message)
 
@@ -64,12 +137,16 @@ def random_barycentric(uniform_random):
         # Elsevier, 2017.
         # 13.6.5 Sampling a triangle
 
-        assert len(uniform_random) == 2
+        # Одна пара чисел или массив пар с последним измерением 2
+
+        uniform_random = np.asarray(uniform_random)
 
-        sqrt_0 = math.sqrt(uniform_random[0])
+        assert uniform_random.shape[-1] == 2
+
+        sqrt_0 = np.sqrt(uniform_random[..., 0])
 
         u = 1 - sqrt_0
-        v = uniform_random[1] * sqrt_0
+        v = uniform_random[..., 1] * sqrt_0
 
         return (u, v)
 
@@ -79,6 +156,155 @@ def triangle_sample(v0, v1, v2):
 
         return v0 * u + v1 * v + v2 * (1 - u - v)
 
+# По одной точке на каждый треугольник с вершинами v0[i], v1[i], v2[i].
+# uniform_random — точки (N, 2) в квадрате [0, 1).
+def triangle_samples(v0, v1, v2, uniform_random):
+
+        assert v0.shape == v1.shape == v2.shape
+        assert uniform_random.shape == (len(v0), 2)
+
+        u, v = random_barycentric(uniform_random)
+
+        u = u[:, np.newaxis]
+        v = v[:, np.newaxis]
+
+        return v0 * u + v1 * v + v2 * (1 - u - v)
+
+# Генераторы точек в квадрате [0, 1) для треугольников, для треугольника i
+# количество точек counts[i]. Точки одного треугольника идут подряд и
+# расположены в квадрате так, как это делает соответствующий семплер,
+# независимо от точек других треугольников.
+# Возвращаемое значение — массив (sum(counts), 2).
+
+# Номер каждой точки среди точек её треугольника
+def point_ranks(counts):
+
+        starts = np.cumsum(counts) - counts
+
+        return np.arange(np.sum(counts)) - np.repeat(starts, counts)
+
+# Для каждого треугольника случайная перестановка номеров его точек
+def random_permutation_ranks(counts, random_generator):
+
+        point_count = np.sum(counts)
+
+        # Номер треугольника плюс случайное число из [0, 1) упорядочивает
+        # точки по треугольникам, а внутри треугольника случайно
+        order = np.argsort(np.repeat(np.arange(len(counts)), counts) + random_generator.random(point_count))
+
+        ranks = np.empty(point_count, dtype = np.int64)
+        ranks[order] = point_ranks(counts)
+
+        return ranks
+
+def random_square_samples(counts, random_generator):
+
+        return random_generator.random((np.sum(counts), 2))
+
+# Квадрат делится на m × m ячеек, m * m >= n для n точек треугольника.
+# Точки находятся в n случайно выбранных разных ячейках.
+def stratified_jittered_square_samples(counts, random_generator):
+
+        m = np.ceil(np.sqrt(counts)).astype(np.int64)
+        m[m * m < counts] += 1
+        m[(m - 1) * (m - 1) >= counts] -= 1
+
+        cell_counts = m * m
+
+        cells = random_permutation_ranks(cell_counts, random_generator)
+
+        cells = cells[point_ranks(cell_counts) < np.repeat(counts, cell_counts)]
+
+        m = np.repeat(m, counts)
+
+        jitter = random_generator.random((len(cells), 2))
+
+        x = (cells % m + jitter[:, 0]) / m
+        y = (cells // m + jitter[:, 1]) / m
+
+        return np.stack((x, y), axis = -1)
+
+# Для каждого измерения своя перестановка n интервалов для n точек треугольника
+def latin_hypercube_square_samples(counts, random_generator):
+
+        n = np.repeat(counts, counts)
+
+        x = (random_permutation_ranks(counts, random_generator) + random_generator.random(len(n))) / n
+        y = (random_permutation_ranks(counts, random_generator) + random_generator.random(len(n))) / n
+
+        return np.stack((x, y), axis = -1)
+
+def radical_inverse(index, base):
+
+        index = np.array(index, dtype = np.int64)
+
+        result = np.zeros(len(index))
+        factor = 1 / base
+
+        while np.any(index > 0):
+                result += (index % base) * factor
+                index //= base
+                factor /= base
+
+        return result
+
+# Точки последовательности Холтона с основаниями 2 и 3, для каждого
+# треугольника свой случайный сдвиг по модулю 1 (Cranley-Patterson)
+def halton_square_samples(counts, random_generator):
+
+        ranks = point_ranks(counts) + 1
+
+        points = np.stack((radical_inverse(ranks, 2), radical_inverse(ranks, 3)), axis = -1)
+
+        points += np.repeat(random_generator.random((len(counts), 2)), counts, axis = 0)
+
+        return points % 1
+
+# Двумерная последовательность Соболя, для каждого треугольника свой
+# случайный цифровой сдвиг (XOR), сохраняющий свойства последовательности
+def sobol_square_samples(counts, random_generator):
+
+        bits = 32
+
+        # Направляющие числа: первое измерение — ван дер Корпут,
+        # второе — для примитивного многочлена x + 1
+        v_0 = [1 << (bits - 1 - k) for k in range(bits)]
+        v_1 = [1 << (bits - 1)]
+        for k in range(1, bits):
+                v_1.append(v_1[-1] ^ (v_1[-1] >> 1))
+
+        ranks = point_ranks(counts).astype(np.uint64)
+
+        x = np.zeros(len(ranks), dtype = np.uint64)
+        y = np.zeros(len(ranks), dtype = np.uint64)
+
+        # Только разряды, которые есть в номерах точек
+        for k in range(int(np.max(ranks, initial = 0)).bit_length()):
+                bit = (ranks >> np.uint64(k)) & np.uint64(1)
+                x ^= bit * np.uint64(v_0[k])
+                y ^= bit * np.uint64(v_1[k])
+
+        shift = random_generator.integers(0, 1 << bits, size = (len(counts), 2), dtype = np.uint64)
+        shift = np.repeat(shift, counts, axis = 0)
+
+        x ^= shift[:, 0]
+        y ^= shift[:, 1]
+
+        return np.stack((x, y), axis = -1) / float(1 << bits)
+
+SAMPLERS = {"random": random_square_samples,
+            "stratified_jittered": stratified_jittered_square_samples,
+            "latin_hypercube": latin_hypercube_square_samples,
+            "sobol": sobol_square_samples,
+            "halton": halton_square_samples}
+
+def check_sampler(sampler):
+
+        if sampler not in SAMPLERS:
+                error("Unknown sampler \"{0}\", supported samplers: {1}".format(sampler, ", ".join(SAMPLERS)))
+
+        return sampler
+
 def parse_float(text):
 
         try:
@@ -103,421 +329,2129 @@ def parse_integer(text):
 
         return r
 
-class Triangle:
+def mix_keys(keys):
 
-        def __init__(self, indices):
+        # Финальное перемешивание SplitMix64
+        keys ^= keys >> np.uint64(30)
+        keys *= np.uint64(0xbf58476d1ce4e5b9)
+        keys ^= keys >> np.uint64(27)
+        keys *= np.uint64(0x94d049bb133111eb)
+        keys ^= keys >> np.uint64(31)
 
-                self.__indices = indices
+# Ключи треугольников faces (F, 3) по двоичному представлению координат
+# их вершин. Треугольники с одинаковыми вершинами в том же порядке имеют
+# одинаковые ключи, поэтому по ключам находятся изменения файла OBJ.
+def triangle_keys(vertices, faces):
 
-                assert len(self.__indices) == 3
-                assert all(isinstance(index, int) for index in self.__indices)
+        keys = np.zeros(len(faces), dtype = np.uint64)
 
-        def sample(self, vertices):
+        for corner in range(3):
+                for coordinate in range(3):
+                        keys ^= vertices[faces[:, corner], coordinate].astype(np.float64).view(np.uint64)
+                        mix_keys(keys)
 
-                # Так работает быстрее, чем v0, v1, v2 = vertices[self.__indices]
-                v0 = vertices[self.__indices[0]]
-                v1 = vertices[self.__indices[1]]
-                v2 = vertices[self.__indices[2]]
+        return keys
 
-                return triangle_sample(v0, v1, v2)
+# Для каждого ключа из keys номер такого же ключа в old_keys или -1.
+# Повторяющиеся ключи не сопоставляются, так как неизвестно, какой
+# треугольник какому соответствует.
+def match_keys(old_keys, keys):
 
-        def area(self, vertices):
+        def repeated(sorted_keys):
+                equal = sorted_keys[1:] == sorted_keys[:-1]
+                result = np.zeros(len(sorted_keys), dtype = bool)
+                result[1:] |= equal
+                result[:-1] |= equal
+                return result
 
-                v0, v1, v2 = vertices[self.__indices]
+        result = np.full(len(keys), -1, dtype = np.int64)
 
-                e1 = v1 - v0
-                e2 = v2 - v0
+        if len(old_keys) == 0 or len(keys) == 0:
+                return result
 
-                cross = np.cross(e1, e2)
+        old_order = np.argsort(old_keys)
+        old_sorted = old_keys[old_order]
 
-                #return 0.5 * np.linalg.norm(cross)
-                return 0.5 * np.sqrt(max(0, cross.dot(cross)))
+        order = np.argsort(keys)
+        new_sorted = keys[order]
 
-class ObjFile:
+        # Двоичный поиск упорядоченных значений работает намного быстрее
+        positions = np.minimum(np.searchsorted(old_sorted, new_sorted), len(old_sorted) - 1)
 
-        @staticmethod
-        def __sample_to_string(sample):
+        found = (old_sorted[positions] == new_sorted) & ~repeated(old_sorted)[positions] & ~repeated(new_sorted)
 
-                assert len(sample) == 3
+        result[order[found]] = old_order[positions[found]]
 
-                return "{:9.6f} {:9.6f} {:9.6f}".format(*sample)
+        return result
 
-        # Строка int/int/int.
-        # Нужно получить первое значение.
-        @staticmethod
-        def __parse_vertex_number(text):
+# Треугольники (F, 3) веером из первой вершины каждой грани. indices —
+# индексы вершин всех граней подряд, sizes — количество вершин граней.
+# Грань из n вершин даёт n - 2 треугольника, все треугольники одной грани
+# идут подряд, грани в исходном порядке. Невыпуклые многоугольники, как
+# и в большинстве программ чтения OBJ, должны быть разделены заранее.
+def fan_triangles(indices, sizes):
 
-                v = text.split("/")
+        if np.all(sizes == 3):
+                return indices.reshape(-1, 3)
 
-                if len(v) < 1:
-                        error("Error face element \"{0}\"".format(text))
+        starts = np.cumsum(sizes) - sizes
 
-                v = v[0].strip()
+        triangle_counts = sizes - 2
 
-                if len(v) < 1:
-                        error("Error face element \"{0}\"".format(text))
+        first = np.repeat(starts, triangle_counts)
+        second = first + 1 + point_ranks(triangle_counts)
 
-                return parse_integer(v)
+        return np.column_stack((indices[first], indices[second], indices[second + 1]))
 
-        # Три числа float float float.
-        @staticmethod
-        def __parse_vertex(line):
+# Типы индексов вершин для массива треугольников (F, 3)
+def face_index_type(vertex_count):
 
-                line = line.strip()
+        if vertex_count <= np.iinfo(np.int32).max:
+                return np.int32
 
-                if len(line) < 1:
-                        error("Empty vertex string")
+        return np.int64
 
-                data = line.split()
+# Площади треугольников, заданных индексами вершин faces (F, 3)
+def triangle_areas(vertices, faces):
 
-                if len(data) != 3:
-                        error("Error vertex line \"{0}\"".format(line))
+        v0 = vertices[faces[:, 0]]
+        v1 = vertices[faces[:, 1]]
+        v2 = vertices[faces[:, 2]]
 
-                return [parse_float(data[i]) for i in range(0, 3)]
+        cross = np.cross(v1 - v0, v2 - v0)
 
-        # Группы из 3 чисел int/int/int int/int/int int/int/int
-        # с возможным отсутствием чисел. Здесь требуется первое
-        # число в каждой группе как индекс вершины.
-        @staticmethod
-        def __parse_face(line):
+        return 0.5 * np.sqrt(np.maximum(0, np.einsum("ij,ij->i", cross, cross)))
 
-                line = line.strip()
+# Формат по расширению файла, если он не задан явно
+def sample_file_format(file_name, file_format = None):
 
-                if len(line) < 1:
-                        error("Empty face string")
+        if file_format is None:
+                extension = os.path.splitext(file_name)[1].lower()
+                for name, format_extension in SAMPLE_FILE_FORMATS.items():
+                        if extension == format_extension:
+                                return name
+                return "text"
 
-                data = line.split()
+        if file_format not in SAMPLE_FILE_FORMATS:
+                error("Unknown sample file format \"{0}\", supported formats: {1}"\
+                      .format(file_format, ", ".join(SAMPLE_FILE_FORMATS)))
 
-                if len(data) < 3:
-                        error("Error face line \"{0}\"".format(line))
+        return file_format
 
-                if len(data) > 3:
-                        error("Faces with {0} vertices are not supported \"{1}\"".format(len(data), line))
+# Все точки блока форматируются одной операцией. Строки из 3 чисел
+# в формате SAMPLE_TEXT_FORMAT, из другого количества чисел — через
+# пробел в том же формате чисел.
+def samples_to_text(samples):
 
-                return [ObjFile.__parse_vertex_number(data[i]) for i in range(0, 3)]
+        assert samples.ndim == 2
 
-        @staticmethod
-        def __correct_face_indices(vertex_count, indices):
+        if samples.shape[1] == 3:
+                line_format = SAMPLE_TEXT_FORMAT
+        else:
+                line_format = " ".join(["%9.6f"] * samples.shape[1]) + "\n"
 
-                assert len(indices) == 3
+        return (line_format * len(samples)) % tuple(samples.ravel().tolist())
 
-                for i in range(0, 3):
+# Точки в том виде, в каком они записываются в файл формата file_format
+def samples_to_bytes(samples, file_format):
 
-                        index = indices[i]
+        if file_format == "text":
+                return samples_to_text(samples).encode()
 
-                        # Индекс может быть отрицательным, поэтому abs
-                        if not 1 <= abs(index) <= vertex_count:
-                                error("Triangle index abs({0}) is out of range [{1}, {2}]"\
-                                      .format(index, 1, vertex_count))
+        if file_format == "float32":
+                return samples.astype(np.float32, copy = False).tobytes()
 
-                        # Надо с началом от 0
-                        if index > 0:
-                                index -= 1
+        assert file_format in ("float64", "npy", "npz")
 
-                        # Если индекс от конца списка, то преобразовать с началом от 0
-                        if index < 0:
-                                index = vertex_count + index
+        return samples.astype(np.float64, copy = False).tobytes()
 
-                        indices[i] = index
+def write_npy_data(f, sample_count, data, columns):
 
-        # Сместить к началу координат в интервал от 0 до 1
-        def __scale_vertices(self):
+        np.lib.format.write_array_header_2_0(f, {"descr": np.lib.format.dtype_to_descr(np.dtype(np.float64)),
+                                                 "fortran_order": False,
+                                                 "shape": (sample_count, columns)})
 
-                vertex_min = np.amin(self.__vertices, axis = 0)
-                vertex_max = np.amax(self.__vertices, axis = 0)
+        for d in data:
+                f.write(d)
 
-                length = vertex_max - vertex_min
-                center = vertex_min + 0.5 * length
+# Запись частей файла, полученных функцией samples_to_bytes.
+# sample_count — количество точек во всех частях, columns — количество
+# чисел каждой точки, нужны для заголовков файлов npy и npz.
+# При ошибке или прерывании недописанный файл удаляется.
+def write_sample_data(file_name, file_format, sample_count, data, columns = 3):
 
-                length_max = max(length)
+        try:
+                write_sample_file(file_name, file_format, sample_count, data, columns)
+        except BaseException:
+                if os.path.isfile(file_name):
+                        os.remove(file_name)
+                raise
 
-                if length_max == 0:
-                        error("No dimensions")
+def write_sample_file(file_name, file_format, sample_count, data, columns):
 
-                scale = 2 / length_max
+        with open(file_name, "wb") as f:
 
-                for i in range(0, len(self.__vertices)):
-                        self.__vertices[i] = (self.__vertices[i] - center) * scale
+                if file_format in ("text", "float32", "float64"):
+                        for d in data:
+                                f.write(d)
 
-        def __compute_area_and_delete_zero_area_triangles(self):
+                elif file_format == "npy":
+                        write_npy_data(f, sample_count, data, columns)
 
-                self.__area = []
-                self.__area_all = 0
+                elif file_format == "npz":
+                        # Как в numpy.savez_compressed, но массив записывается по частям
+                        with zipfile.ZipFile(f, "w", compression = zipfile.ZIP_DEFLATED) as zip_file:
+                                with zip_file.open("samples.npy", "w", force_zip64 = True) as npy_file:
+                                        write_npy_data(npy_file, sample_count, data, columns)
 
-                i = 0
-                while i < len(self.__triangles):
-                        area = self.__triangles[i].area(self.__vertices)
-                        if area != 0:
-                                self.__area.append(area)
-                                self.__area_all += area
-                                i += 1
-                        else:
-                                self.__triangles.pop(i)
+                else:
+                        assert False
 
-                assert len(self.__triangles) == len(self.__area)
+# Блоки blocks с вызовом progress("sample", количество записанных точек,
+# sample_count) после записи каждого блока. block_sizes — количество точек
+# в блоках, если блоки не массивы точек.
+def report_progress(blocks, progress, sample_count, block_sizes = None):
 
-        def __triangle_sample_string(self, index):
+        if block_sizes is not None:
+                block_sizes = iter(block_sizes)
 
-                sample = self.__triangles[index].sample(self.__vertices)
+        done = 0
 
-                return self.__sample_to_string(sample)
+        for block in blocks:
+                yield block
+                done += len(block) if block_sizes is None else next(block_sizes)
+                progress("sample", done, sample_count)
 
-        def __init__(self, file_name):
+# Запись блоков точек (n, columns) в файл
+def write_sample_blocks(file_name, file_format, sample_count, blocks, columns = 3):
 
-                self.__file_name = file_name
-                self.__triangles = []
-                self.__vertices = []
+        file_format = sample_file_format(file_name, file_format)
 
-                for line in open(file_name):
+        data = (samples_to_bytes(block, file_format) for block in blocks)
 
-                        line = line.strip()
+        write_sample_data(file_name, file_format, sample_count, data, columns)
 
-                        if line == "":
-                                continue
+# Точки треугольников faces (F, 3), для треугольника i количество точек counts[i].
+# Точки одного треугольника идут подряд. sampler — один из SAMPLERS.
+# Если return_barycentrics, то возвращаются ещё и барицентрические
+# координаты (N, 3) точек относительно вершин их треугольников.
+def sample_triangles(vertices, faces, counts, random_generator, sampler = "random", return_barycentrics = False):
 
-                        if line[0] == "#":
-                                continue
+        assert len(faces) == len(counts)
 
-                        first = line.split()[0]
+        uniform_random = SAMPLERS[sampler](counts, random_generator)
 
-                        if first == "v":
+        triangles = faces[np.repeat(np.arange(len(faces)), counts)]
 
-                                second = line[len(first):]
+        v0 = vertices[triangles[:, 0]]
+        v1 = vertices[triangles[:, 1]]
+        v2 = vertices[triangles[:, 2]]
 
-                                self.__vertices.append(self.__parse_vertex(second))
+        samples = triangle_samples(v0, v1, v2, uniform_random)
 
-                        elif first == "f":
+        if not return_barycentrics:
+                return samples
 
-                                second = line[len(first):]
+        u, v = random_barycentric(uniform_random)
 
-                                indices = self.__parse_face(second)
+        return samples, np.stack((u, v, 1 - u - v), axis = -1)
 
-                                self.__correct_face_indices(len(self.__vertices), indices)
+def unit_vectors(vectors):
 
-                                self.__triangles.append(Triangle(indices))
+        lengths = np.linalg.norm(vectors, axis = 1, keepdims = True)
 
-                if len(self.__triangles) == 0:
-                        error("No triangles loaded from OBJ file")
+        return np.divide(vectors, lengths, out = np.zeros_like(vectors), where = lengths > 0)
 
-                self.__vertices = np.array(self.__vertices)
+# Атрибуты точек, интерполированные по барицентрическим координатам
+# barycentrics (n, 3) точек в треугольниках triangles (n) массива faces.
+# attributes — словарь массивов атрибутов ObjFile. Возвращаются единичные
+# нормали (n, 3) и текстурные координаты (n, 2). Если у треугольника
+# нет нормалей вершин, то берётся нормаль его плоскости, если нет
+# текстурных координат, то они NaN.
+def interpolate_attributes(vertices, faces, attributes, triangles, barycentrics):
 
-                self.__scale_vertices()
-                self.__compute_area_and_delete_zero_area_triangles()
+        weights = barycentrics[:, :, np.newaxis]
 
-                if len(self.__triangles) == 0:
-                        error("No 2D triangles")
+        def interpolate(values, face_values, empty):
 
-        def print_statictics(self):
+                indices = face_values[triangles]
+                present = np.all(indices >= 0, axis = 1)
 
-                triangle_count = len(self.__triangles)
-                area_min = min(self.__area)
-                area_max = max(self.__area)
-                area_average = self.__area_all / triangle_count
-                area_median = statistics.median(self.__area)
+                result = np.full((len(triangles), values.shape[1]), empty)
 
-                print("File \"{0}\"\n".format(self.__file_name))
-                print("triangle count = {0}".format(triangle_count))
-                print("area all = {0}".format(self.__area_all))
-                print("area min = {0}".format(area_min))
-                print("area max = {0}".format(area_max))
-                print("area ratio = {0}".format(area_max / area_min))
-                print("area average = {0}".format(area_average))
-                print("area median = {0}".format(area_median))
+                if np.any(present):
+                        result[present] = np.sum(values[indices[present]] * weights[present], axis = 1)
 
-        def write_samples_to_file(self, file_name, sample_count):
+                return result, present
 
-                assert len(self.__triangles) == len(self.__area)
+        normals, has_normals = interpolate(attributes["normals"], attributes["face_normals"], 0.0)
 
-                sample_density = sample_count / self.__area_all
+        if not np.all(has_normals):
+                triangle_vertices = vertices[faces[triangles[~has_normals]]].astype(np.float64)
+                normals[~has_normals] = np.cross(triangle_vertices[:, 1] - triangle_vertices[:, 0],
+                                                 triangle_vertices[:, 2] - triangle_vertices[:, 0])
 
-                all_sample_count = 0
+        texture_coordinates, has_texture_coordinates = interpolate(attributes["texture_coordinates"],
+                                                                   attributes["face_texture_coordinates"], np.nan)
 
-                print("\nFile \"{0}\", sample count {1}\n".format(file_name, sample_count))
+        return unit_vectors(normals), texture_coordinates
 
-                with open(file_name, "w") as f:
+# Части parts — кортежи массивов одинаковой длины. Они объединяются
+# и делятся на блоки ровно по block_size строк, кроме последнего блока.
+def fixed_size_blocks(parts, block_size):
 
-                        for i in range(0, len(self.__triangles)):
+        assert block_size > 0
 
-                                count = math.ceil(sample_density * self.__area[i])
+        buffer = []
+        buffer_size = 0
 
-                                for _ in range(0, count):
-                                        print(self.__triangle_sample_string(i), file = f)
+        for part in parts:
 
-                                all_sample_count += count
+                begin = 0
 
-                                if (i + 1) % 100 == 0:
-                                        print("{0} samples for {1} ({2}) triangles"\
-                                              .format(all_sample_count, i + 1, len(self.__triangles)))
+                while begin < len(part[0]):
 
-                print("\nsample count {0} ({1})".format(all_sample_count, sample_count))
+                        end = min(len(part[0]), begin + block_size - buffer_size)
 
-                return all_sample_count
+                        buffer.append(tuple(array[begin:end] for array in part))
 
-def test_triangle_samples(point_count):
+                        buffer_size += end - begin
+                        begin = end
 
-        # 3 вершины по 2 координаты в каждой
-        vertices = np.random.rand(3, 2)
+                        if buffer_size == block_size:
+                                yield buffer[0] if len(buffer) == 1 else tuple(map(np.concatenate, zip(*buffer)))
+                                buffer = []
+                                buffer_size = 0
 
-        points = [triangle_sample(*vertices) for i in range(0, point_count)]
+        if buffer_size > 0:
+                yield buffer[0] if len(buffer) == 1 else tuple(map(np.concatenate, zip(*buffer)))
 
-        show_triangle_samples("Test Triangle Samples", "Samples", vertices, points)
+# Части треугольников (begin, end, counts[begin:end]), в каждой части
+# около shard_size точек. Треугольник, у которого точек больше shard_size,
+# делится на несколько частей (i, i + 1, [n]) не больше shard_size точек,
+# поэтому количество точек в части не больше 2 * shard_size. Для
+# семплеров с расслоением точки такого треугольника расслаиваются
+# в каждой его части отдельно.
+def sample_shards(counts, shard_size):
 
-def check_file_names(obj_file, sample_file):
+        assert shard_size > 0
 
-        if not os.path.exists(obj_file):
-                error("File \"{0}\" doesn't exist".format(obj_file))
-        if not os.path.isfile(obj_file):
-                error("\"{0}\" is not a file".format(obj_file))
+        shards = []
 
-        if os.path.exists(sample_file):
-                if not os.path.isfile(sample_file):
-                        error("\"{0}\" is not a file".format(sample_file))
-                if os.path.samefile(obj_file, sample_file):
-                        error("obj_file sample_file are the same")
+        def add_triangles(begin, end):
 
-def get_sample_count(sample_count):
+                if begin == end:
+                        return
 
-        try:
-                sample_count = int(sample_count)
-        except Exception:
-                error("Error sample count \"{0}\" conversion to integer".format(sample_count))
+                cumulative = np.cumsum(counts[begin:end])
 
-        if sample_count <= 0:
-                error("Sample count must be positive")
+                ends = np.searchsorted(cumulative, np.arange(shard_size, cumulative[-1], shard_size)) + 1 + begin
 
-        return sample_count
+                bounds = np.unique(np.concatenate(([begin], ends, [end]))).tolist()
 
-def sample_obj_file(obj_file, sample_file, sample_count):
+                shards.extend((b, e, counts[b:e]) for b, e in zip(bounds[:-1], bounds[1:]))
 
-        check_file_names(obj_file, sample_file)
+        begin = 0
 
-        sample_count = get_sample_count(sample_count)
+        for i in np.flatnonzero(counts > shard_size).tolist():
 
-        file = ObjFile(obj_file)
+                add_triangles(begin, i)
 
-        file.print_statictics()
+                for offset in range(0, int(counts[i]), shard_size):
+                        shards.append((i, i + 1, np.array([min(shard_size, counts[i] - offset)], dtype = counts.dtype)))
 
-        all_sample_count = file.write_samples_to_file(sample_file, sample_count)
+                begin = i + 1
 
-        return all_sample_count
+        add_triangles(begin, len(counts))
 
-class Window():
+        return shards
 
-        def open_button(self):
+# Номера в массиве точек для точек треугольников, у которых первая
+# точка имеет номер starts[i], а количество точек равно counts[i]
+def point_positions(starts, counts):
 
-                name = tk.filedialog.askopenfilename(filetypes = [("OBJ files","*.obj")])
+        return np.repeat(starts, counts) + point_ranks(counts)
 
-                if len(name) == 0:
-                        return
+# Файл с данными предыдущего вычисления точек для файла точек file_name
+def sample_state_file_name(file_name):
 
-                self.filename_open.set(name)
+        return file_name + ".state.npz"
 
-                file_name, _ = os.path.splitext(name)
-                file_name_save = file_name + "_samples.txt"
-                if not os.path.exists(file_name_save):
-                        self.filename_save.set(file_name_save)
-                else:
-                        if tk.messagebox.askyesno("File exists",
-                                                  "File for OBJ samples '" +
-                                                  file_name_save +
-                                                  "' already exists.\n" +
-                                                  "Do you want to overwrite it?"):
-                                self.filename_save.set(file_name_save)
-                        else:
-                                self.filename_save.set("")
+# Словарь массивов файла состояния или None, если его нет
+# или он создан для другого семплера
+def read_sample_state(file_name, sampler):
 
-        def save_button(self):
+        try:
+                with np.load(file_name) as data:
+                        if str(data["sampler"]) != sampler:
+                                return None
+                        return {name : data[name] for name in ("keys", "counts", "normalization", "samples")}
+        except (OSError, KeyError, ValueError):
+                return None
 
-                name = tk.filedialog.asksaveasfilename(defaultextension = ".txt",
-                                                       filetypes = [("Sample files","*.txt")])
+def write_sample_state(file_name, sampler, keys, counts, normalization, samples):
 
-                if len(name) > 0:
-                        self.filename_save.set(name)
+        temp_file_name = file_name + ".tmp"
 
-        def run_button(self):
+        with open(temp_file_name, "wb") as f:
+                np.savez(f, sampler = np.array(sampler), keys = keys, counts = counts,
+                         normalization = normalization, samples = samples)
 
-                if len(self.filename_open.get().strip()) == 0:
-                        tk.messagebox.showerror("Error", "Empty OBJ file name")
-                        return
+        os.replace(temp_file_name, file_name)
 
-                if len(self.filename_save.get().strip()) == 0:
-                        tk.messagebox.showerror("Error", "Empty sample file name")
-                        return
+# Вершины и треугольники в процессах параллельного вычисления точек
+shard_mesh = None
 
-                point_count = self.point_count.get().strip()
-                if len(point_count) == 0:
-                        tk.messagebox.showerror("Error", "Empty point count")
-                        return
-                try:
-                        point_count = parse_integer(point_count)
-                except Exception as e:
-                        tk.messagebox.showerror("Error", "{0}".format(e))
-                        return
-                if point_count <= 0:
-                        tk.messagebox.showerror("Error", "Point count must be positive")
-                        return
+def init_shard_process(vertices, faces, attributes):
 
-                self.compute(self.filename_open.get(), self.filename_save.get(), point_count)
+        global shard_mesh
 
-        @staticmethod
-        def compute(file_open, file_save, point_count):
+        shard_mesh = (vertices, faces, attributes)
 
-                try:
-                        all_point_count = sample_obj_file(file_open, file_save, point_count)
-                except Exception as e:
-                        tk.messagebox.showerror("Error", "{0}".format(e))
-                        return
+# Точки части треугольников записываются в файл shard_file_name
+# в формате file_format, но без заголовков файла. Если заданы
+# атрибуты, то каждая точка записывается с нормалью и текстурными
+# координатами.
+def write_shard(mesh, shard_file_name, file_format, sampler, begin, end, counts, seed):
 
-                tk.messagebox.showinfo("Information", "{0} samples generated".format(all_point_count))
+        vertices, faces, attributes = mesh
 
-        @staticmethod
-        def set_style():
+        result = sample_triangles(vertices, faces[begin:end], counts, np.random.default_rng(seed), sampler,
+                                  return_barycentrics = attributes is not None)
 
-                style = tk.ttk.Style()
+        if attributes is not None:
+                samples, barycentrics = result
+                triangles = np.repeat(np.arange(begin, end), counts)
+                normals, texture_coordinates = interpolate_attributes(vertices, faces, attributes, triangles,
+                                                                      barycentrics)
+                samples = np.column_stack((samples, normals, texture_coordinates))
+        else:
+                samples = result
 
-                if "xpnative" in style.theme_names():
-                        style.theme_use("xpnative")
-                elif "aqua" in style.theme_names():
-                        style.theme_use("aqua")
-                elif "clam" in style.theme_names():
-                        style.theme_use("clam")
+        with open(shard_file_name, "wb") as f:
+                f.write(samples_to_bytes(samples, file_format))
 
-        def __init__(self):
+        return shard_file_name
 
-                root = tk.Tk()
+# Функция заданий процессов, точки записываются в файл, поэтому
+# в основной процесс передаётся только имя файла
+def sample_shard(*task):
 
-                self.set_style()
+        return write_shard(shard_mesh, *task)
 
-                root.title("OBJ file samples")
-                root.resizable(width=True, height=False)
-                root.minsize(width=700, height=0)
+# Данные файлов частей по порядку частями по SHARD_FILE_CHUNK_SIZE байтов.
+# Каждый файл удаляется после чтения.
+def shard_file_data(shard_file_names):
 
-                frame = tk.Frame(root, padx=5, pady=5)
+        for shard_file_name in shard_file_names:
+                with open(shard_file_name, "rb") as f:
+                        while True:
+                                data = f.read(SHARD_FILE_CHUNK_SIZE)
+                                if len(data) == 0:
+                                        break
+                                yield data
+                os.remove(shard_file_name)
 
-                frame.pack(fill=tk.BOTH, expand=tk.YES)
+# Результаты заданий в порядке их следования. Одновременно выполняется
+# не более window заданий, чтобы не занимать память готовыми частями.
+def ordered_results(executor, function, tasks, window):
 
-                tk.Label(frame, text = 'File OBJ:').grid(row=0, column=0)
-                self.filename_open = tk.StringVar()
-                tk.Entry(frame, textvariable=self.filename_open).grid(row=0, column=1, sticky='ew')
-                tk.Button(frame, text='...', command=self.open_button).grid(row=0, column=2)
+        pending = collections.deque()
 
-                tk.Label(frame, text='File Samples:').grid(row=1, column=0)
-                self.filename_save = tk.StringVar()
-                tk.Entry(frame, textvariable=self.filename_save).grid(row=1, column=1, sticky='ew')
-                tk.Button(frame, text='...', command=self.save_button).grid(row=1, column=2)
+        for task in tasks:
 
-                tk.Label(frame, text = 'Sample Count:').grid(row=2, column=0)
-                self.point_count = tk.StringVar()
-                tk.Entry(frame, textvariable=self.point_count).grid(row=2, column=1, sticky='ew')
+                pending.append(executor.submit(function, *task))
 
-                tk.Grid.rowconfigure(frame, 0, weight=1)
-                tk.Grid.rowconfigure(frame, 1, weight=1)
+                if len(pending) >= window:
+                        yield pending.popleft().result()
+
+        while len(pending) > 0:
+                yield pending.popleft().result()
+
+# Время этапов вычисления, счётчики и, если заданы, профиль cProfile
+# и пиковая память tracemalloc по этапам. Время вложенного этапа
+# не входит во время внешнего этапа, поэтому сумма времён этапов
+# не больше общего времени. Для каждого этапа в отчёте указан
+# внешний этап при его первом вызове.
+class Profiler:
+
+        def __init__(self, use_cprofile = False, use_tracemalloc = False):
+
+                self.__times = collections.OrderedDict()
+                self.__calls = collections.OrderedDict()
+                self.__memory = collections.OrderedDict()
+                self.__parents = collections.OrderedDict()
+                self.__counters = collections.OrderedDict()
+                self.__stack = []
+                self.__cprofile = cProfile.Profile() if use_cprofile else None
+                self.__use_tracemalloc = use_tracemalloc
+                self.__start_time = None
+                self.__total_time = 0.0
+
+        def start(self):
+
+                if self.__use_tracemalloc:
+                        tracemalloc.start()
+
+                if self.__cprofile is not None:
+                        self.__cprofile.enable()
+
+                self.__start_time = time.perf_counter()
+
+        def stop(self):
+
+                self.__total_time += time.perf_counter() - self.__start_time
+
+                if self.__cprofile is not None:
+                        self.__cprofile.disable()
+
+                if self.__use_tracemalloc:
+                        tracemalloc.stop()
+
+        # Пиковая память с начала этапа или с начала вложенного этапа
+        @staticmethod
+        def __memory_peak():
+
+                if not tracemalloc.is_tracing():
+                        return 0
+
+                peak = tracemalloc.get_traced_memory()[1]
+
+                if hasattr(tracemalloc, "reset_peak"):
+                        tracemalloc.reset_peak()
+
+                return peak
+
+        @contextlib.contextmanager
+        def stage(self, name):
+
+                now = time.perf_counter()
+
+                if len(self.__stack) > 0:
+                        parent = self.__stack[-1]
+                        parent[1] += now - parent[2]
+                        parent[3] = max(parent[3], self.__memory_peak())
+                else:
+                        self.__memory_peak()
+
+                # Внешний этап при первом вызове этапа
+                if name not in self.__parents:
+                        self.__parents[name] = self.__stack[-1][0] if len(self.__stack) > 0 else None
+
+                # Имя, время, начало последнего отрезка времени, пиковая память
+                self.__stack.append([name, 0.0, now, 0])
+
+                try:
+                        yield
+                finally:
+                        now = time.perf_counter()
+
+                        name, duration, begin, memory = self.__stack.pop()
+                        duration += now - begin
+                        memory = max(memory, self.__memory_peak())
+
+                        self.__times[name] = self.__times.get(name, 0.0) + duration
+                        self.__calls[name] = self.__calls.get(name, 0) + 1
+                        self.__memory[name] = max(self.__memory.get(name, 0), memory)
+
+                        if len(self.__stack) > 0:
+                                parent = self.__stack[-1]
+                                parent[2] = now
+                                parent[3] = max(parent[3], memory)
+
+        def count(self, name, value = 1):
+
+                self.__counters[name] = self.__counters.get(name, 0) + value
+
+        # Элементы iterable, время получения которых относится к этапу name
+        def iterate(self, name, iterable):
+
+                iterator = iter(iterable)
+
+                while True:
+                        with self.stage(name):
+                                try:
+                                        item = next(iterator)
+                                except StopIteration:
+                                        return
+                        yield item
+
+        def __cprofile_functions(self, function_count):
+
+                if self.__cprofile is None:
+                        return []
+
+                stats = pstats.Stats(self.__cprofile, stream = io.StringIO())
+
+                functions = sorted(stats.stats.items(), key = lambda item: item[1][3], reverse = True)
+
+                return [{"function": "{0}:{1}({2})".format(*function),
+                         "calls": calls,
+                         "time": total_time,
+                         "cumulative time": cumulative_time}
+                        for function, (primitive_calls, calls, total_time, cumulative_time, callers)
+                        in functions[:function_count]]
+
+        # Отчёт для преобразования в JSON. Пиковая память этапов
+        # в байтах, если задан use_tracemalloc.
+        def report(self, function_count = 20):
+
+                stages = collections.OrderedDict()
+
+                for name, duration in self.__times.items():
+                        stages[name] = {"time": duration, "calls": self.__calls[name], "parent": self.__parents[name]}
+                        if self.__use_tracemalloc:
+                                stages[name]["memory peak"] = self.__memory[name]
+
+                report = {"total time": self.__total_time, "stages": stages, "counters": dict(self.__counters)}
+
+                if self.__cprofile is not None:
+                        report["cprofile"] = self.__cprofile_functions(function_count)
+
+                return report
+
+        def json_report(self, function_count = 20):
+
+                return json.dumps(self.report(function_count))
+
+# Profiler, который ничего не измеряет, для вызовов без профилирования
+class NullProfiler:
+
+        @contextlib.contextmanager
+        def stage(self, name):
+
+                yield
+
+        def count(self, name, value = 1):
+
+                pass
+
+        def iterate(self, name, iterable):
+
+                return iterable
+
+NULL_PROFILER = NullProfiler()
+
+# Разобранный файл OBJ, записанный рядом с ним в двоичном виде.
+# Формат файла:
+#  MAGIC
+#  длина заголовка, 8 байт little-endian
+#  заголовок JSON с ключом файла OBJ и описанием массивов
+#  массивы, каждый с границы ALIGNMENT байт от начала данных
+class ObjCache:
+
+        SUFFIX = ".cache"
+        MAGIC = b"OBJ SAMPLES CACHE 2\n"
+        ALIGNMENT = 64
+
+        def __init__(self, file_name):
+
+                self.__file_name = file_name
+                self.__cache_file_name = file_name + self.SUFFIX
+
+        @staticmethod
+        def file_hash(file_name):
+
+                file_hash = hashlib.sha256()
+
+                with open(file_name, "rb") as f:
+                        for data in iter(lambda: f.read(OBJ_CHUNK_SIZE), b""):
+                                file_hash.update(data)
+
+                return file_hash.hexdigest()
+
+        def __key(self, stat, file_hash):
+
+                return {"path": os.path.abspath(self.__file_name),
+                        "size": stat.st_size,
+                        "mtime": stat.st_mtime_ns,
+                        "hash": file_hash}
+
+        # Если совпадает время изменения, то содержимое файла не читается.
+        # Если время изменилось, а содержимое нет, то в key записывается
+        # новое время изменения.
+        def __is_valid(self, key):
+
+                stat = os.stat(self.__file_name)
+
+                if key["path"] != os.path.abspath(self.__file_name) or key["size"] != stat.st_size:
+                        return False
+
+                if key["mtime"] == stat.st_mtime_ns:
+                        return True
+
+                if key["hash"] != self.file_hash(self.__file_name):
+                        return False
+
+                key["mtime"] = stat.st_mtime_ns
+
+                return True
+
+        # Запись заголовка на место прежнего заголовка, если он не длиннее
+        # прежнего, с пробелами в конце. Если записать не удалось, то файл
+        # остаётся прежним и при чтении снова вычисляется хеш.
+        def __rewrite_header(self, header, header_size):
+
+                header = json.dumps(header).encode()
+
+                if len(header) > header_size:
+                        return
+
+                try:
+                        with open(self.__cache_file_name, "r+b") as f:
+                                f.seek(len(self.MAGIC) + 8)
+                                f.write(header.ljust(header_size))
+                except OSError:
+                        pass
+
+        @staticmethod
+        def __align(offset):
+
+                return -(-offset // ObjCache.ALIGNMENT) * ObjCache.ALIGNMENT
+
+        # Словарь массивов, отображённых в память только для чтения,
+        # или None, если файла нет или он не соответствует файлу OBJ
+        def read(self):
+
+                try:
+                        with open(self.__cache_file_name, "rb") as f:
+                                if f.read(len(self.MAGIC)) != self.MAGIC:
+                                        return None
+                                header_size = int.from_bytes(f.read(8), "little")
+                                header = json.loads(f.read(header_size).decode())
+                except (OSError, ValueError):
+                        return None
+
+                try:
+                        mtime = header["key"]["mtime"]
+
+                        if not self.__is_valid(header["key"]):
+                                return None
+
+                        # Чтобы при следующем чтении не вычислять хеш
+                        if header["key"]["mtime"] != mtime:
+                                self.__rewrite_header(header, header_size)
+
+                        data_offset = self.__align(len(self.MAGIC) + 8 + header_size)
+
+                        return {name : np.memmap(self.__cache_file_name, mode = "r",
+                                                 dtype = np.dtype(array["dtype"]),
+                                                 offset = data_offset + array["offset"],
+                                                 shape = tuple(array["shape"]))
+                                for name, array in header["arrays"].items()}
+
+                except (KeyError, TypeError, OSError, ValueError):
+                        return None
+
+        # stat и file_hash — это данные файла OBJ до начала его чтения.
+        # Запись во временный файл с последующей заменой, чтобы
+        # не было частично записанного файла.
+        def write(self, stat, file_hash, arrays):
+
+                header = {"key": self.__key(stat, file_hash), "arrays": {}}
+
+                offset = 0
+                for name, array in arrays.items():
+                        header["arrays"][name] = {"dtype": array.dtype.str, "shape": array.shape, "offset": offset}
+                        offset = self.__align(offset + array.nbytes)
+
+                header = json.dumps(header).encode()
+
+                data_offset = self.__align(len(self.MAGIC) + 8 + len(header))
+
+                temp_file_name = self.__cache_file_name + ".tmp"
+
+                with open(temp_file_name, "wb") as f:
+
+                        f.write(self.MAGIC)
+                        f.write(len(header).to_bytes(8, "little"))
+                        f.write(header)
+
+                        for array in arrays.values():
+                                f.write(bytes(data_offset + self.__align(f.tell() - data_offset) - f.tell()))
+                                np.ascontiguousarray(array).tofile(f)
+
+                os.replace(temp_file_name, self.__cache_file_name)
+
+class ObjFile:
+
+        # Строка int/int/int.
+        # Нужно получить первое значение.
+        @staticmethod
+        def __parse_vertex_number(text):
+
+                v = text.split("/")
+
+                if len(v) < 1:
+                        error("Error face element \"{0}\"".format(text))
+
+                v = v[0].strip()
+
+                if len(v) < 1:
+                        error("Error face element \"{0}\"".format(text))
+
+                return parse_integer(v)
+
+        # Три числа float float float.
+        @staticmethod
+        def __parse_vertex(line):
+
+                line = line.strip()
+
+                if len(line) < 1:
+                        error("Empty vertex string")
+
+                data = line.split()
+
+                if len(data) != 3:
+                        error("Error vertex line \"{0}\"".format(line))
+
+                return [parse_float(data[i]) for i in range(0, 3)]
+
+        # Не меньше 3 групп из 3 чисел int/int/int int/int/int int/int/int
+        # с возможным отсутствием чисел. Здесь требуется первое
+        # число в каждой группе как индекс вершины.
+        @staticmethod
+        def __parse_face(line):
+
+                line = line.strip()
+
+                if len(line) < 1:
+                        error("Empty face string")
+
+                data = line.split()
+
+                if len(data) < 3:
+                        error("Error face line \"{0}\"".format(line))
+
+                return [ObjFile.__parse_vertex_number(element) for element in data]
+
+        @staticmethod
+        def __correct_face_indices(vertex_count, indices):
+
+                assert len(indices) >= 3
+
+                for i in range(0, len(indices)):
+
+                        index = indices[i]
+
+                        # Индекс может быть отрицательным, поэтому abs
+                        if not 1 <= abs(index) <= vertex_count:
+                                error("Triangle index abs({0}) is out of range [{1}, {2}]"\
+                                      .format(index, 1, vertex_count))
+
+                        # Надо с началом от 0
+                        if index > 0:
+                                index -= 1
+
+                        # Если индекс от конца списка, то преобразовать с началом от 0
+                        if index < 0:
+                                index = vertex_count + index
+
+                        indices[i] = index
+
+        # Индексы вершин граней подряд из файла и количество вершин,
+        # прочитанных до грани каждого индекса. name — название индексов
+        # в сообщении об ошибке.
+        @staticmethod
+        def __correct_face_index_array(vertex_counts, indices, name = "Triangle"):
+
+                # Индекс может быть отрицательным, поэтому abs
+                index_abs = np.abs(indices)
+
+                out_of_range = (index_abs < 1) | (index_abs > vertex_counts)
+
+                if np.any(out_of_range):
+                        i = np.argmax(out_of_range)
+                        error("{0} index abs({1}) is out of range [{2}, {3}]"\
+                              .format(name, indices[i], 1, vertex_counts[i]))
+
+                # Надо с началом от 0, а индексы от конца списка преобразовать с началом от 0
+                return np.where(indices > 0, indices - 1, vertex_counts + indices)
+
+        # Разбор фрагмента файла по одной строке. Нужен только для того,
+        # чтобы найти первую строку с ошибкой, если не удалось разобрать
+        # весь фрагмент сразу.
+        @staticmethod
+        def __parse_lines(text, vertex_count):
+
+                for line in text.decode(errors = "replace").splitlines():
+
+                        line = line.strip()
+
+                        if line == "":
+                                continue
+
+                        if line[0] == "#":
+                                continue
+
+                        first = line.split()[0]
+
+                        if first == "v":
+
+                                second = line[len(first):]
+
+                                ObjFile.__parse_vertex(second)
+
+                                vertex_count += 1
+
+                        elif first == "f":
+
+                                second = line[len(first):]
+
+                                indices = ObjFile.__parse_face(second)
+
+                                ObjFile.__correct_face_indices(vertex_count, indices)
+
+                error("Error OBJ file data")
+
+        # Разбор всех строк "v" и "f" фрагмента файла сразу.
+        # vertex_count — количество вершин в предыдущих фрагментах.
+        # Многоугольники разделяются на треугольники функцией fan_triangles.
+        # Возвращаемое значение
+        # (вершины (V, 3), треугольники (F, 3) с индексами от 0 по всем фрагментам)
+        @staticmethod
+        def __parse_records(text, vertex_count, profiler):
+
+                with profiler.stage("parse"):
+
+                        records = OBJ_RECORD_PATTERN.findall(text)
+
+                        kinds = np.frombuffer(b"".join(map(operator.itemgetter(0), records)), dtype = np.uint8)
+                        bodies = list(map(operator.itemgetter(1), records))
+
+                        is_vertex = kinds == ord("v")
+
+                        vertex_data = list(map(bytes.split, itertools.compress(bodies, is_vertex.tolist())))
+                        face_data = list(map(bytes.split, itertools.compress(bodies, (~is_vertex).tolist())))
+
+                        vertex_sizes = np.fromiter(map(len, vertex_data), dtype = np.int64, count = len(vertex_data))
+                        face_sizes = np.fromiter(map(len, face_data), dtype = np.int64, count = len(face_data))
+
+                        if np.any(vertex_sizes != 3) or np.any(face_sizes < 3):
+                                ObjFile.__parse_lines(text, vertex_count)
+
+                        vertex_tokens = list(itertools.chain.from_iterable(vertex_data))
+
+                        face_tokens = b" ".join(itertools.chain.from_iterable(face_data))
+                        face_tokens = OBJ_FACE_ELEMENT_SUFFIX_PATTERN.sub(b"", face_tokens).split()
+
+                        if len(face_tokens) != np.sum(face_sizes):
+                                ObjFile.__parse_lines(text, vertex_count)
+
+                        try:
+                                vertices = np.array(vertex_tokens, dtype = np.float64).reshape(-1, 3)
+                                indices = np.array(face_tokens, dtype = np.int64)
+                        except (ValueError, OverflowError):
+                                ObjFile.__parse_lines(text, vertex_count)
+
+                with profiler.stage("index correction"):
+
+                        # Количество вершин, прочитанных до каждой грани
+                        vertex_counts = vertex_count + np.cumsum(is_vertex)[~is_vertex]
+
+                        indices = ObjFile.__correct_face_index_array(np.repeat(vertex_counts, face_sizes), indices)
+
+                with profiler.stage("triangulation"):
+
+                        return vertices, fan_triangles(indices, face_sizes)
+
+        # Индексы атрибутов из элементов граней. Отсутствующие индексы
+        # равны -1, остальные с началом от 0 по всем фрагментам.
+        @staticmethod
+        def __attribute_index_array(tokens, counts, name):
+
+                tokens = np.array(tokens, dtype = bytes)
+
+                present = tokens != b""
+
+                indices = np.full(len(tokens), -1, dtype = np.int64)
+
+                try:
+                        indices[present] = tokens[present].astype(np.int64)
+                except (ValueError, OverflowError):
+                        for token in tokens[present]:
+                                parse_integer(token.decode(errors = "replace"))
+
+                indices[present] = ObjFile.__correct_face_index_array(counts[present], indices[present], name)
+
+                return indices
+
+        # Разбор строк "vt", "vn" и "f" фрагмента файла. Фрагмент уже
+        # проверен функцией __parse_records. normal_count и texture_count —
+        # количество нормалей и текстурных координат в предыдущих фрагментах.
+        # Возвращаемое значение
+        # (нормали (N, 3), индексы нормалей треугольников (F, 3),
+        #  текстурные координаты (T, 2), их индексы для треугольников (F, 3)),
+        # треугольники те же, что у __parse_records, а отсутствующие индексы равны -1.
+        @staticmethod
+        def __parse_attribute_records(text, normal_count, texture_count):
+
+                records = OBJ_ATTRIBUTE_RECORD_PATTERN.findall(text)
+
+                kinds = np.array(list(map(operator.itemgetter(0), records)), dtype = "S2")
+                bodies = list(map(operator.itemgetter(1), records))
+
+                is_normal = kinds == b"vn"
+                is_texture = kinds == b"vt"
+                is_face = kinds == b"f"
+
+                normal_bodies = list(itertools.compress(bodies, is_normal.tolist()))
+                texture_bodies = list(itertools.compress(bodies, is_texture.tolist()))
+
+                normal_data = list(map(bytes.split, normal_bodies))
+                texture_data = list(map(bytes.split, texture_bodies))
+                face_data = list(map(bytes.split, itertools.compress(bodies, is_face.tolist())))
+
+                for data, line_bodies, sizes, name in ((normal_data, normal_bodies, (3,), "vertex normal"),
+                                                       (texture_data, texture_bodies, (1, 2, 3), "texture coordinate")):
+                        for d, body in zip(data, line_bodies):
+                                if len(d) not in sizes:
+                                        error("Error {0} line \"{1}\"".format(name, body.decode(errors = "replace").strip()))
+
+                # Текстурные координаты u [v [w]], нужны u и v, v по умолчанию 0
+                texture_data = [d[:2] if len(d) > 1 else [d[0], b"0"] for d in texture_data]
+
+                try:
+                        normals = np.array(normal_data, dtype = np.float64).reshape(-1, 3)
+                        textures = np.array(texture_data, dtype = np.float64).reshape(-1, 2)
+                except ValueError as e:
+                        error("{0}".format(e))
+
+                face_sizes = np.fromiter(map(len, face_data), dtype = np.int64, count = len(face_data))
+
+                elements = b"\n".join(itertools.chain.from_iterable(face_data))
+
+                attribute_tokens = OBJ_FACE_ELEMENT_ATTRIBUTE_PATTERN.findall(elements) if len(elements) > 0 else []
+
+                assert len(attribute_tokens) == np.sum(face_sizes)
+
+                # Количество нормалей и текстурных координат, прочитанных до каждой грани
+                normal_counts = np.repeat(normal_count + np.cumsum(is_normal)[is_face], face_sizes)
+                texture_counts = np.repeat(texture_count + np.cumsum(is_texture)[is_face], face_sizes)
+
+                face_textures = ObjFile.__attribute_index_array(list(map(operator.itemgetter(0), attribute_tokens)),
+                                                                texture_counts, "Texture coordinate")
+                face_normals = ObjFile.__attribute_index_array(list(map(operator.itemgetter(1), attribute_tokens)),
+                                                               normal_counts, "Normal")
+
+                return (normals, fan_triangles(face_normals, face_sizes),
+                        textures, fan_triangles(face_textures, face_sizes))
+
+        # Фрагменты файла размером около chunk_size, заканчивающиеся
+        # на границе строки. Если chunk_size равен None, то весь файл.
+        @staticmethod
+        def __read_file_chunks(file_name, chunk_size, file_hash):
+
+                with open(file_name, "rb") as f:
+
+                        if chunk_size is None:
+                                data = f.read()
+                                if file_hash is not None:
+                                        file_hash.update(data)
+                                yield data
+                                return
+
+                        rest = b""
+
+                        while True:
+
+                                data = f.read(chunk_size)
+
+                                if len(data) == 0:
+                                        break
+
+                                if file_hash is not None:
+                                        file_hash.update(data)
+
+                                data = rest + data
+
+                                end = data.rfind(b"\n") + 1
+
+                                rest = data[end:]
+
+                                if end > 0:
+                                        yield data[:end]
+
+                        if len(rest) > 0:
+                                yield rest
+
+        # Потоковое чтение файла OBJ фрагментами размером около chunk_size.
+        # Для каждого фрагмента возвращаются его вершины (V, 3) и треугольники
+        # (F, 3) с индексами от 0 по всем вершинам файла, поэтому в памяти
+        # находится только один фрагмент текста файла. Если задан file_hash
+        # из hashlib, то в него добавляется всё прочитанное из файла.
+        # profiler — Profiler для этапов чтения и разбора. Если attributes,
+        # то после вершин и треугольников возвращаются ещё нормали (N, 3),
+        # индексы нормалей треугольников (F, 3), текстурные координаты (T, 2)
+        # и индексы текстурных координат треугольников (F, 3), отсутствующие
+        # в файле индексы равны -1. Если задана функция progress, то после
+        # разбора каждого фрагмента вызывается progress("load", количество
+        # разобранных байтов, размер файла).
+        @staticmethod
+        def read_chunks(file_name, chunk_size = OBJ_CHUNK_SIZE, file_hash = None, profiler = NULL_PROFILER,
+                        attributes = False, progress = None):
+
+                vertex_count = 0
+                normal_count = 0
+                texture_count = 0
+
+                file_size = os.path.getsize(file_name)
+                parsed_size = 0
+
+                for text in profiler.iterate("read", ObjFile.__read_file_chunks(file_name, chunk_size, file_hash)):
+
+                        profiler.count("bytes read", len(text))
+
+                        vertices, faces = ObjFile.__parse_records(text, vertex_count, profiler)
+
+                        parsed_size += len(text)
+
+                        vertex_count += len(vertices)
+
+                        if not attributes:
+                                chunk = (vertices, faces)
+                        else:
+                                with profiler.stage("attributes"):
+                                        chunk_attributes = ObjFile.__parse_attribute_records(text, normal_count,
+                                                                                             texture_count)
+
+                                normal_count += len(chunk_attributes[0])
+                                texture_count += len(chunk_attributes[2])
+
+                                chunk = (vertices, faces) + chunk_attributes
+
+                        if progress is not None:
+                                progress("load", parsed_size, file_size)
+
+                        yield chunk
+
+        # Сместить к началу координат в интервал от 0 до 1.
+        # Изменяется сам массив вершин, без временных копий.
+        def __scale_vertices(self):
+
+                vertex_min = np.amin(self.__vertices, axis = 0)
+                vertex_max = np.amax(self.__vertices, axis = 0)
+
+                # NaN и бесконечность переходят в минимум или максимум
+                if not (np.all(np.isfinite(vertex_min)) and np.all(np.isfinite(vertex_max))):
+                        error("Vertex coordinates are not finite")
+
+                length = vertex_max.astype(np.float64) - vertex_min
+                center = vertex_min + 0.5 * length
+
+                length_max = max(length)
+
+                if length_max == 0:
+                        error("No dimensions")
+
+                scale = 2 / length_max
+
+                self.__vertices -= center.astype(self.__vertices.dtype)
+                self.__vertices *= self.__vertices.dtype.type(scale)
+
+                self.__normalization = np.append(center, scale)
+
+        def __compute_area_and_delete_zero_area_triangles(self):
+
+                area = triangle_areas(self.__vertices, self.__faces)
+
+                non_zero = np.isfinite(area) & (area > 0)
+
+                self.__faces = self.__faces[non_zero]
+                self.__keys = self.__keys[non_zero]
+                self.__area = area[non_zero]
+
+                if self.__attributes is not None:
+                        for name in ("face_normals", "face_texture_coordinates"):
+                                self.__attributes[name] = self.__attributes[name][non_zero]
+                self.__area_all = float(np.sum(self.__area, dtype = np.float64))
+
+                assert len(self.__faces) == len(self.__area) == len(self.__keys)
+
+        def __load(self, chunk_size, file_hash, dtype, attributes, profiler, progress):
+
+                shapes = [(3, dtype), (3, np.int64)]
+                if attributes:
+                        shapes += [(3, dtype), (3, np.int64), (2, dtype), (3, np.int64)]
+
+                chunks = [[np.empty((0, columns), dtype = array_type)] for columns, array_type in shapes]
+
+                for chunk in self.read_chunks(self.__file_name, chunk_size, file_hash, profiler, attributes, progress):
+                        for arrays, array in zip(chunks, chunk):
+                                arrays.append(array)
+
+                with profiler.stage("concatenate"):
+
+                        # Сразу в нужный тип, без промежуточного массива
+                        arrays = [np.concatenate(arrays, dtype = array_type)
+                                  for arrays, (columns, array_type) in zip(chunks, shapes)]
+                        del chunks
+
+                        self.__vertices, self.__faces = arrays[:2]
+
+                        if len(self.__faces) == 0:
+                                error("No triangles loaded from OBJ file")
+
+                        self.__faces = self.__faces.astype(face_index_type(len(self.__vertices)))
+
+                        if attributes:
+                                normals, face_normals, texture_coordinates, face_texture_coordinates = arrays[2:]
+                                self.__attributes = {
+                                        "normals": normals,
+                                        "face_normals": face_normals.astype(face_index_type(len(normals))),
+                                        "texture_coordinates": texture_coordinates,
+                                        "face_texture_coordinates":
+                                                face_texture_coordinates.astype(face_index_type(len(texture_coordinates)))}
+
+                profiler.count("vertices", len(self.__vertices))
+                profiler.count("faces", len(self.__faces))
+
+                with profiler.stage("keys"):
+                        self.__keys = triangle_keys(self.__vertices, self.__faces)
+
+                with profiler.stage("normalize"):
+                        self.__scale_vertices()
+
+                face_count = len(self.__faces)
+
+                with profiler.stage("area"):
+                        self.__compute_area_and_delete_zero_area_triangles()
+
+                profiler.count("zero area faces", face_count - len(self.__faces))
+
+                if len(self.__faces) == 0:
+                        error("No 2D triangles")
+
+        # Если cache, то при наличии актуального файла ObjCache данные берутся
+        # из него, иначе после разбора файла OBJ записывается файл ObjCache.
+        # dtype — тип координат вершин, np.float32 или np.float64.
+        # profiler — Profiler для этапов загрузки. Если attributes,
+        # то читаются ещё нормали вершин "vn" и текстурные координаты "vt"
+        # для вычисления их значений в точках. progress — функция
+        # сообщения о ходе разбора файла, как у read_chunks.
+        def __init__(self, file_name, chunk_size = OBJ_CHUNK_SIZE, cache = False, dtype = np.float64,
+                     profiler = NULL_PROFILER, attributes = False, progress = None):
+
+                if np.dtype(dtype) not in (np.float32, np.float64):
+                        error("Unsupported vertex type {0}".format(np.dtype(dtype)))
+
+                self.__file_name = file_name
+                self.__area_probabilities = None
+                self.__attributes = None
+
+                if not cache:
+                        self.__load(chunk_size, None, dtype, attributes, profiler, progress)
+                        return
+
+                obj_cache = ObjCache(file_name)
+
+                with profiler.stage("cache read"):
+                        arrays = obj_cache.read()
+
+                if arrays is not None and arrays["vertices"].dtype == dtype and (not attributes or "normals" in arrays):
+                        profiler.count("cache hits")
+                        self.__vertices = arrays["vertices"]
+                        self.__faces = arrays["faces"]
+                        self.__area = arrays["area"]
+                        self.__keys = arrays["keys"]
+                        self.__normalization = arrays["normalization"]
+                        self.__area_all = float(np.sum(self.__area, dtype = np.float64))
+                        if attributes:
+                                self.__attributes = {name: arrays[name] for name in ATTRIBUTE_ARRAYS}
+                        return
+
+                stat = os.stat(file_name)
+                file_hash = hashlib.sha256()
+
+                self.__load(chunk_size, file_hash, dtype, attributes, profiler, progress)
+
+                arrays = {"vertices": self.__vertices, "faces": self.__faces, "area": self.__area,
+                          "keys": self.__keys, "normalization": self.__normalization}
+
+                if attributes:
+                        arrays.update(self.__attributes)
+
+                try:
+                        with profiler.stage("cache write"):
+                                obj_cache.write(stat, file_hash.hexdigest(), arrays)
+                except OSError as e:
+                        print("Cache file is not written: {0}".format(e))
+
+        # Статистика площадей треугольников. Процентили, в том числе медиана,
+        # находятся за одно частичное упорядочивание массива площадей.
+        # Гистограмма с логарифмическими интервалами, так как площади
+        # обычно отличаются на порядки.
+        def statistics(self, percentiles = AREA_PERCENTILES, bins = AREA_HISTOGRAM_BINS):
+
+                area_min = float(np.min(self.__area))
+                area_max = float(np.max(self.__area))
+
+                percentile_values = np.percentile(self.__area, (50,) + tuple(percentiles))
+
+                histogram, bin_edges = np.histogram(self.__area, np.geomspace(area_min, area_max, bins + 1))
+
+                return {"triangle count": len(self.__faces),
+                        "vertex count": len(self.__vertices),
+                        "area all": self.__area_all,
+                        "area min": area_min,
+                        "area max": area_max,
+                        "area ratio": area_max / area_min,
+                        "area average": self.__area_all / len(self.__faces),
+                        "area median": float(percentile_values[0]),
+                        "area percentiles": dict(zip(percentiles, percentile_values[1:].tolist())),
+                        "area histogram": list(zip(bin_edges[:-1].tolist(), bin_edges[1:].tolist(), histogram.tolist()))}
+
+        def print_statictics(self):
+
+                statistics = self.statistics()
+
+                print("File \"{0}\"\n".format(self.__file_name))
+
+                for name in ("triangle count", "vertex count", "area all", "area min", "area max",
+                             "area ratio", "area average", "area median"):
+                        print("{0} = {1}".format(name, statistics[name]))
+
+                for percentile, value in statistics["area percentiles"].items():
+                        print("area percentile {0} = {1}".format(percentile, value))
+
+                print("area histogram:")
+
+                for begin, end, count in statistics["area histogram"]:
+                        print("  [{0:.6e}, {1:.6e}] {2}".format(begin, end, count))
+
+        # Ровно sample_count точек. Количество точек треугольников — одна
+        # выборка мультиномиального распределения с вероятностями,
+        # пропорциональными площадям, как при выборе sample_count
+        # треугольников с вероятностью по площади, но за время O(F)
+        # независимо от sample_count. Массив вероятностей вычисляется
+        # один раз для объекта.
+        def __exact_sample_counts(self, sample_count, random_generator):
+
+                if self.__area_probabilities is None:
+                        # Сумма всех вероятностей, кроме последней, не больше 1
+                        # с точностью до ошибки округления одного деления
+                        self.__area_probabilities = np.asarray(self.__area, dtype = np.float64) / self.__area_all
+
+                return random_generator.multinomial(sample_count, self.__area_probabilities).astype(np.int64)
+
+        # Если exact_count, то ровно sample_count точек, иначе для каждого
+        # треугольника округлённое вверх количество точек при плотности,
+        # соответствующей sample_count точкам на всю площадь
+        def __sample_counts(self, sample_count, exact_count, random_generator):
+
+                if exact_count:
+                        return self.__exact_sample_counts(sample_count, random_generator)
+
+                sample_density = sample_count / self.__area_all
+
+                return np.ceil(sample_density * self.__area).astype(np.int64)
+
+        def vertices(self):
+
+                return self.__vertices
+
+        def faces(self):
+
+                return self.__faces
+
+        # Словарь массивов ATTRIBUTE_ARRAYS или None, если файл
+        # прочитан без атрибутов
+        def attributes(self):
+
+                return self.__attributes
+
+        def __check_attributes(self):
+
+                if self.__attributes is None:
+                        error("OBJ file is loaded without attributes")
+
+        # Точки частями по SAMPLE_SHARD_SIZE точек, поэтому последовательность
+        # точек не зависит от размера блоков, на которые они потом делятся.
+        # Каждая часть — кортеж из точек и, если требуется, номеров
+        # треугольников, барицентрических координат, нормалей
+        # и текстурных координат.
+        def __sample_parts(self, counts, random_generator, sampler, triangles, barycentrics,
+                           normals = False, texture_coordinates = False):
+
+                return_barycentrics = barycentrics or normals or texture_coordinates
+
+                for begin, end, shard_counts in sample_shards(counts, SAMPLE_SHARD_SIZE):
+
+                        result = sample_triangles(self.__vertices, self.__faces[begin:end], shard_counts,
+                                                  random_generator, sampler, return_barycentrics)
+
+                        samples, sample_barycentrics = result if return_barycentrics else (result, None)
+
+                        if triangles or normals or texture_coordinates:
+                                sample_triangle_indices = np.repeat(np.arange(begin, end), shard_counts)
+
+                        part = [samples]
+
+                        if triangles:
+                                part.append(sample_triangle_indices)
+
+                        if barycentrics:
+                                part.append(sample_barycentrics)
+
+                        if normals or texture_coordinates:
+                                sample_normals, sample_texture_coordinates = interpolate_attributes(
+                                        self.__vertices, self.__faces, self.__attributes,
+                                        sample_triangle_indices, sample_barycentrics)
+                                if normals:
+                                        part.append(sample_normals)
+                                if texture_coordinates:
+                                        part.append(sample_texture_coordinates)
+
+                        yield tuple(part)
+
+        # Все точки одним массивом (N, 3). Точки одного треугольника
+        # идут подряд, треугольники в порядке их следования в файле.
+        # sampler — один из SAMPLERS.
+        def samples(self, sample_count, random_generator = None, exact_count = False, sampler = "random"):
+
+                assert len(self.__faces) == len(self.__area)
+
+                check_sampler(sampler)
+
+                if random_generator is None:
+                        random_generator = np.random.default_rng()
+
+                counts = self.__sample_counts(sample_count, exact_count, random_generator)
+
+                samples = np.empty((np.sum(counts), 3), dtype = self.__vertices.dtype)
+
+                begin = 0
+                for part_samples, in self.__sample_parts(counts, random_generator, sampler, False, False):
+                        samples[begin : begin + len(part_samples)] = part_samples
+                        begin += len(part_samples)
+
+                return samples
+
+        # Точки блоками по block_size точек (последний блок может быть меньше),
+        # в памяти находится не больше одного блока и одной части точек, поэтому
+        # общее количество точек не ограничено памятью. Точки те же, что и
+        # у функции samples при том же генераторе случайных чисел.
+        # Если triangles, barycentrics, normals или texture_coordinates, то каждый
+        # блок — это кортеж из точек, затем номеров их треугольников в массиве
+        # faces(), затем барицентрических координат (n, 3) относительно вершин
+        # треугольников, затем нормалей (n, 3) и текстурных координат (n, 2)
+        # по функции interpolate_attributes, иначе блок — это только массив
+        # точек (n, 3). Для нормалей и текстурных координат файл должен быть
+        # прочитан с attributes.
+        def sample_blocks(self, sample_count, block_size = SAMPLE_BLOCK_SIZE, random_generator = None,
+                          exact_count = False, sampler = "random", triangles = False, barycentrics = False,
+                          normals = False, texture_coordinates = False):
+
+                check_sampler(sampler)
+
+                if normals or texture_coordinates:
+                        self.__check_attributes()
+
+                if random_generator is None:
+                        random_generator = np.random.default_rng()
+
+                counts = self.__sample_counts(sample_count, exact_count, random_generator)
+
+                parts = self.__sample_parts(counts, random_generator, sampler, triangles, barycentrics,
+                                            normals, texture_coordinates)
+
+                for block in fixed_size_blocks(parts, block_size):
+                        yield block if len(block) > 1 else block[0]
+
+        # Точки треугольников, которые не изменились с предыдущего вычисления,
+        # берутся из файла состояния с пересчётом под новую нормализацию
+        # вершин. Изменение общей площади изменяет количество точек почти
+        # всех треугольников, поэтому для случайного семплера берутся первые
+        # min(старое, новое количество) точек треугольника, а недостающие
+        # точки добавляются. Для семплеров с расслоением часть набора точек
+        # или набор с добавленными точками не расслоены, поэтому для них
+        # точки берутся только при том же количестве точек треугольника.
+        # Точки остальных треугольников вычисляются заново.
+        def __incremental_samples(self, state_file_name, counts, random_generator, sampler):
+
+                state = read_sample_state(state_file_name, sampler)
+
+                # Количество точек каждого треугольника из файла состояния
+                reused_counts = np.zeros(len(counts), dtype = np.int64)
+
+                if state is not None:
+                        old_triangles = match_keys(state["keys"], np.asarray(self.__keys))
+                        matched = old_triangles >= 0
+                        old_counts = state["counts"][old_triangles[matched]]
+                        if sampler == "random":
+                                reused_counts[matched] = np.minimum(old_counts, counts[matched])
+                        else:
+                                reused_counts[matched] = np.where(old_counts == counts[matched], old_counts, 0)
+
+                new_counts = counts - reused_counts
+
+                # Точки треугольника: сначала взятые из файла состояния, затем новые
+                starts = np.cumsum(counts) - counts
+
+                samples = np.empty((np.sum(counts), 3))
+
+                reused = reused_counts > 0
+
+                if np.any(reused):
+
+                        old_starts = np.cumsum(state["counts"]) - state["counts"]
+
+                        old_positions = point_positions(old_starts[old_triangles[reused]], reused_counts[reused])
+
+                        old_samples = state["samples"][old_positions]
+
+                        if not np.array_equal(state["normalization"], self.__normalization):
+                                old_center, old_scale = state["normalization"][:3], state["normalization"][3]
+                                center, scale = self.__normalization[:3], self.__normalization[3]
+                                old_samples = (old_samples / old_scale + old_center - center) * scale
+
+                        samples[point_positions(starts[reused], reused_counts[reused])] = old_samples
+
+                sampled = new_counts > 0
+
+                samples[point_positions(starts[sampled] + reused_counts[sampled], new_counts[sampled])]\
+                        = sample_triangles(self.__vertices, self.__faces[sampled], new_counts[sampled],
+                                           random_generator, sampler)
+
+                write_sample_state(state_file_name, sampler, self.__keys, counts, self.__normalization, samples)
+
+                print("{0} of {1} samples reused, {2} of {3} triangles sampled".format(
+                        int(np.sum(reused_counts)), len(samples), np.count_nonzero(sampled), len(counts)))
+
+                return samples
+
+        # Части треугольников обрабатываются в process_count процессах,
+        # для каждой части свой генератор случайных чисел из SeedSequence.spawn.
+        # Каждая часть записывается в свой файл во временном каталоге рядом
+        # с файлом точек, затем файлы частей по порядку копируются в файл точек.
+        # При одном процессе части обрабатываются без пула процессов.
+        def __write_samples_parallel(self, file_name, file_format, sampler, counts, random_generator, process_count,
+                                     attributes, progress):
+
+                shards = sample_shards(counts, SAMPLE_SHARD_SIZE)
+
+                seed_sequence = np.random.SeedSequence(random_generator.integers(2**63))
+
+                mesh = (np.asarray(self.__vertices), np.asarray(self.__faces),
+                        {name: np.asarray(array) for name, array in self.__attributes.items()} if attributes else None)
+
+                with tempfile.TemporaryDirectory(dir = os.path.dirname(os.path.abspath(file_name))) as directory:
+
+                        tasks = ((os.path.join(directory, "{0}.shard".format(i)), file_format, sampler,
+                                  begin, end, shard_counts, seed)
+                                 for i, ((begin, end, shard_counts), seed)
+                                 in enumerate(zip(shards, seed_sequence.spawn(len(shards)))))
+
+                        with contextlib.ExitStack() as stack:
+
+                                if process_count > 1:
+                                        executor = stack.enter_context(concurrent.futures.ProcessPoolExecutor(
+                                                max_workers = process_count, initializer = init_shard_process,
+                                                initargs = mesh))
+                                        shard_file_names = ordered_results(executor, sample_shard, tasks,
+                                                                           2 * process_count)
+                                else:
+                                        shard_file_names = (write_shard(mesh, *task) for task in tasks)
+
+                                if progress is not None:
+                                        shard_file_names = report_progress(
+                                                shard_file_names, progress, int(np.sum(counts)),
+                                                (int(np.sum(shard_counts)) for begin, end, shard_counts in shards))
+
+                                write_sample_data(file_name, file_format, int(np.sum(counts)),
+                                                  shard_file_data(shard_file_names),
+                                                  SAMPLE_ATTRIBUTE_COLUMNS if attributes else 3)
+
+        # file_format — один из SAMPLE_FILE_FORMATS или None для определения
+        # формата по расширению файла. Если задан process_count, то точки
+        # вычисляются по частям треугольников в process_count процессах,
+        # файл не зависит от количества процессов, но отличается от файла
+        # без process_count при том же генераторе. Если exact_count,
+        # то записывается ровно sample_count точек. sampler — один из SAMPLERS.
+        # Если incremental, то заново вычисляются только точки изменившихся
+        # треугольников по сравнению с предыдущим таким же вызовом для этого
+        # файла точек, при этом process_count не используется. profiler —
+        # Profiler для этапов вычисления и записи точек. Если attributes,
+        # то каждая точка записывается с нормалью и текстурными координатами,
+        # SAMPLE_ATTRIBUTE_COLUMNS чисел, файл должен быть прочитан с attributes.
+        # Если задана функция progress, то она вызывается после записи каждого
+        # блока точек, как в report_progress. Она может прервать запись
+        # исключением, тогда недописанный файл удаляется.
+        def write_samples_to_file(self, file_name, sample_count, file_format = None, random_generator = None,
+                                  process_count = None, exact_count = False, sampler = "random", incremental = False,
+                                  profiler = NULL_PROFILER, attributes = False, progress = None):
+
+                file_format = sample_file_format(file_name, file_format)
+
+                check_sampler(sampler)
+
+                if attributes:
+                        self.__check_attributes()
+                        if incremental:
+                                error("Incremental sampling of attributes is not supported")
+
+                if random_generator is None:
+                        random_generator = np.random.default_rng()
+
+                print("\nFile \"{0}\", format {1}, sample count {2}\n".format(file_name, file_format, sample_count))
+
+                with profiler.stage("counts"):
+                        counts = self.__sample_counts(sample_count, exact_count, random_generator)
+
+                if incremental or process_count is None or process_count < 1:
+
+                        if incremental:
+                                with profiler.stage("sample"):
+                                        samples = self.__incremental_samples(sample_state_file_name(file_name), counts,
+                                                                             random_generator, sampler)
+                                blocks = (samples[i : i + SAMPLE_BLOCK_SIZE] for i in range(0, len(samples), SAMPLE_BLOCK_SIZE))
+                        else:
+                                parts = self.__sample_parts(counts, random_generator, sampler, False, False,
+                                                            attributes, attributes)
+                                blocks = (block[0] if len(block) == 1 else np.column_stack(block)
+                                          for block in fixed_size_blocks(parts, SAMPLE_BLOCK_SIZE))
+
+                        if progress is not None:
+                                blocks = report_progress(blocks, progress, int(np.sum(counts)))
+
+                        # Время вычисления блоков не входит во время записи
+                        with profiler.stage("write"):
+                                write_sample_blocks(file_name, file_format, int(np.sum(counts)),
+                                                    profiler.iterate("sample", blocks),
+                                                    SAMPLE_ATTRIBUTE_COLUMNS if attributes else 3)
+
+                else:
+
+                        with profiler.stage("sample and write"):
+                                self.__write_samples_parallel(file_name, file_format, sampler, counts, random_generator,
+                                                              process_count, attributes, progress)
+
+                all_sample_count = int(np.sum(counts))
+
+                profiler.count("samples", all_sample_count)
+                profiler.count("bytes written", os.path.getsize(file_name))
+
+                print("{0} samples for {1} triangles".format(all_sample_count, len(self.__faces)))
+
+                print("\nsample count {0} ({1})".format(all_sample_count, sample_count))
+
+                return all_sample_count
+
+def test_triangle_samples(point_count):
+
+        # 3 вершины по 2 координаты в каждой
+        vertices = np.random.rand(3, 2)
+
+        points = [triangle_sample(*vertices) for i in range(0, point_count)]
+
+        show_triangle_samples("Test Triangle Samples", "Samples", vertices, points)
+
+def check_file_names(obj_file, sample_file):
+
+        if not os.path.exists(obj_file):
+                error("File \"{0}\" doesn't exist".format(obj_file))
+        if not os.path.isfile(obj_file):
+                error("\"{0}\" is not a file".format(obj_file))
+
+        if os.path.exists(sample_file):
+                if not os.path.isfile(sample_file):
+                        error("\"{0}\" is not a file".format(sample_file))
+                if os.path.samefile(obj_file, sample_file):
+                        error("obj_file sample_file are the same")
+
+def get_sample_count(sample_count):
+
+        try:
+                sample_count = int(sample_count)
+        except Exception:
+                error("Error sample count \"{0}\" conversion to integer".format(sample_count))
+
+        if sample_count <= 0:
+                error("Sample count must be positive")
+
+        return sample_count
+
+def sample_obj_file(obj_file, sample_file, sample_count, file_format = None, random_generator = None, cache = True,
+                    process_count = None, exact_count = False, sampler = "random", incremental = False,
+                    dtype = np.float64, profiler = NULL_PROFILER, attributes = False, progress = None):
+
+        check_file_names(obj_file, sample_file)
+
+        sample_count = get_sample_count(sample_count)
+
+        file_format = sample_file_format(sample_file, file_format)
+
+        check_sampler(sampler)
+
+        file = ObjFile(obj_file, cache = cache, dtype = dtype, profiler = profiler, attributes = attributes,
+                       progress = progress)
+
+        file.print_statictics()
+
+        all_sample_count = file.write_samples_to_file(sample_file, sample_count, file_format, random_generator,
+                                                      process_count, exact_count, sampler, incremental, profiler,
+                                                      attributes, progress)
+
+        return all_sample_count
+
+# Параметры задания пакетной обработки и их значения по умолчанию
+BATCH_JOB_DEFAULTS = collections.OrderedDict((("file_format", None), ("sampler", "random"), ("exact_count", False),
+                                              ("seed", None), ("attributes", False)))
+
+# Файл с параметрами выполненного задания рядом с файлом точек
+def batch_job_stamp_file_name(sample_file):
+
+        return sample_file + ".job.json"
+
+def batch_job_stamp(job):
+
+        stat = os.stat(job["obj_file"])
+
+        return {"job": job, "obj size": stat.st_size, "obj mtime": stat.st_mtime_ns,
+                "sample size": os.path.getsize(job["sample_file"])}
+
+# Задание выполнено с теми же параметрами, файл OBJ после этого
+# не изменялся и файл точек не изменялся
+def is_batch_job_up_to_date(job):
+
+        try:
+                with open(batch_job_stamp_file_name(job["sample_file"])) as f:
+                        stamp = json.load(f)
+                return stamp == batch_job_stamp(job)
+        except (OSError, ValueError):
+                return False
+
+def batch_job(obj_file, sample_file, sample_count, **parameters):
+
+        for name in parameters:
+                if name not in BATCH_JOB_DEFAULTS:
+                        error("Unknown batch job parameter \"{0}\"".format(name))
+
+        job = {"obj_file": obj_file, "sample_file": sample_file, "sample_count": get_sample_count(sample_count)}
+
+        for name, default in BATCH_JOB_DEFAULTS.items():
+                job[name] = parameters.get(name, default)
+
+        job["file_format"] = sample_file_format(sample_file, job["file_format"])
+        check_sampler(job["sampler"])
+
+        return job
+
+# Файл JSON со списком заданий, каждое задание — объект с ключами
+# obj_file, sample_file, sample_count и, если нужно, ключами
+# BATCH_JOB_DEFAULTS. Пути файлов относительно файла списка.
+def read_batch_manifest(file_name):
+
+        try:
+                with open(file_name) as f:
+                        entries = json.load(f)
+        except ValueError as e:
+                error("Error batch manifest \"{0}\": {1}".format(file_name, e))
+
+        if not isinstance(entries, list):
+                error("Batch manifest \"{0}\" is not a list of jobs".format(file_name))
+
+        directory = os.path.dirname(os.path.abspath(file_name))
+
+        jobs = []
+
+        for entry in entries:
+
+                if not isinstance(entry, dict) or not {"obj_file", "sample_file", "sample_count"} <= entry.keys():
+                        error("Batch job must have obj_file, sample_file and sample_count: {0}".format(entry))
+
+                entry = dict(entry)
+                entry["obj_file"] = os.path.join(directory, entry["obj_file"])
+                entry["sample_file"] = os.path.join(directory, entry["sample_file"])
+
+                jobs.append(batch_job(**entry))
+
+        return jobs
+
+# Задания для всех файлов OBJ по шаблону glob. Файл точек рядом
+# с файлом OBJ, с расширением формата file_format.
+def batch_jobs_from_pattern(pattern, sample_count, file_format = "text"):
+
+        sample_file_format(pattern, file_format)
+
+        obj_files = sorted(glob.glob(pattern, recursive = True))
+
+        if len(obj_files) == 0:
+                error("No files match \"{0}\"".format(pattern))
+
+        return [batch_job(obj_file, os.path.splitext(obj_file)[0] + SAMPLE_FILE_FORMATS[file_format], sample_count,
+                          file_format = file_format)
+                for obj_file in obj_files]
+
+# Задания одного файла OBJ. Файл разбирается один раз для всех заданий,
+# разобранный файл берётся из ObjCache или записывается в ObjCache.
+# Сообщения функций не выводятся, чтобы не смешивать их с сообщениями
+# других процессов.
+def run_batch_jobs(jobs):
+
+        results = []
+
+        obj_file = None
+
+        with contextlib.redirect_stdout(io.StringIO()):
+
+                for job in jobs:
+
+                        result = {"obj_file": job["obj_file"], "sample_file": job["sample_file"],
+                                  "load time": 0.0, "sample time": 0.0}
+
+                        try:
+                                check_file_names(job["obj_file"], job["sample_file"])
+
+                                if obj_file is None:
+                                        start = time.perf_counter()
+                                        obj_file = ObjFile(job["obj_file"], cache = True,
+                                                           attributes = any(j["attributes"] for j in jobs))
+                                        result["load time"] = time.perf_counter() - start
+
+                                start = time.perf_counter()
+                                result["samples"] = obj_file.write_samples_to_file(
+                                        job["sample_file"], job["sample_count"], job["file_format"],
+                                        np.random.default_rng(job["seed"]), exact_count = job["exact_count"],
+                                        sampler = job["sampler"], attributes = job["attributes"])
+                                result["sample time"] = time.perf_counter() - start
+
+                                with open(batch_job_stamp_file_name(job["sample_file"]), "w") as f:
+                                        json.dump(batch_job_stamp(job), f)
+
+                                result["status"] = "done"
+
+                        # Любая ошибка задания, например нехватка памяти в numpy,
+                        # не останавливает остальные задания
+                        except Exception as e:
+                                result["status"] = "error"
+                                result["error"] = type(e).__name__
+                                result["message"] = "{0}".format(e)
+
+                        results.append(result)
+
+        return results
+
+# Выполнение заданий в process_count процессах, по умолчанию по количеству
+# процессоров. Задания одного файла OBJ выполняются вместе. Задания,
+# для которых файл точек актуален, не выполняются, если не force.
+# Возвращаются результаты заданий в порядке заданий.
+def sample_obj_files(jobs, process_count = None, force = False):
+
+        results = [None] * len(jobs)
+
+        groups = collections.OrderedDict()
+
+        for i, job in enumerate(jobs):
+                if not force and is_batch_job_up_to_date(job):
+                        results[i] = {"obj_file": job["obj_file"], "sample_file": job["sample_file"],
+                                      "status": "up to date", "load time": 0.0, "sample time": 0.0}
+                else:
+                        groups.setdefault(os.path.realpath(job["obj_file"]), []).append(i)
+
+        groups = list(groups.values())
+
+        if process_count is None:
+                process_count = os.cpu_count() or 1
+
+        process_count = min(process_count, len(groups))
+
+        def store(group, group_results):
+                for i, result in zip(group, group_results):
+                        results[i] = result
+
+        if process_count <= 1:
+                for group in groups:
+                        store(group, run_batch_jobs([jobs[i] for i in group]))
+                return results
+
+        with concurrent.futures.ProcessPoolExecutor(max_workers = process_count) as executor:
+
+                futures = {executor.submit(run_batch_jobs, [jobs[i] for i in group]): group for group in groups}
+
+                for future in concurrent.futures.as_completed(futures):
+                        store(futures[future], future.result())
+
+        return results
+
+def batch_report(results, time_all):
+
+        lines = ["{0:<10} {1:>9} {2:>9} {3:>12}  {4}".format("status", "load, s", "sample, s", "samples", "file")]
+
+        for result in results:
+                lines.append("{0:<10} {1:>9.3f} {2:>9.3f} {3:>12}  {4}".format(
+                        result["status"], result["load time"], result["sample time"], result.get("samples", ""),
+                        result["sample_file"]))
+                if "message" in result:
+                        lines.append("           {0}: {1}".format(result["error"], result["message"]))
+
+        statuses = collections.Counter(result["status"] for result in results)
+
+        lines.append("\n{0} jobs: {1}, time {2:.3f} s".format(
+                len(results), ", ".join("{0} {1}".format(count, status) for status, count in statuses.items()),
+                time_all))
+
+        return "\n".join(lines)
+
+# batch manifest.json
+# batch "pattern" sample_count [text|float32|float64|npy|npz]
+def run_batch(argv):
+
+        if len(argv) == 1 and argv[0].lower().endswith(".json"):
+                jobs = read_batch_manifest(argv[0])
+        elif len(argv) in (2, 3):
+                jobs = batch_jobs_from_pattern(*argv)
+        else:
+                error("Usage: batch manifest.json | batch \"pattern\" sample_count [text|float32|float64|npy|npz]")
+
+        start = time.perf_counter()
+
+        results = sample_obj_files(jobs)
+
+        print(batch_report(results, time.perf_counter() - start))
+
+        if any(result["status"] == "error" for result in results):
+                error("Not all batch jobs are done")
+
+class Window():
+
+        def open_button(self):
+
+                name = tk.filedialog.askopenfilename(filetypes = [("OBJ files","*.obj")])
+
+                if len(name) == 0:
+                        return
+
+                self.filename_open.set(name)
+
+                file_name, _ = os.path.splitext(name)
+                file_name_save = file_name + "_samples.txt"
+                if not os.path.exists(file_name_save):
+                        self.filename_save.set(file_name_save)
+                else:
+                        if tk.messagebox.askyesno("File exists",
+                                                  "File for OBJ samples '" +
+                                                  file_name_save +
+                                                  "' already exists.\n" +
+                                                  "Do you want to overwrite it?"):
+                                self.filename_save.set(file_name_save)
+                        else:
+                                self.filename_save.set("")
+
+        def save_button(self):
+
+                name = tk.filedialog.asksaveasfilename(defaultextension = ".txt",
+                                                       filetypes = [("Sample files","*.txt"),
+                                                                    ("NumPy files","*.npy"),
+                                                                    ("Compressed NumPy files","*.npz"),
+                                                                    ("Binary float32 files","*.f32"),
+                                                                    ("Binary float64 files","*.f64")])
+
+                if len(name) > 0:
+                        self.filename_save.set(name)
+
+        def run_button(self):
+
+                if len(self.filename_open.get().strip()) == 0:
+                        tk.messagebox.showerror("Error", "Empty OBJ file name")
+                        return
+
+                if len(self.filename_save.get().strip()) == 0:
+                        tk.messagebox.showerror("Error", "Empty sample file name")
+                        return
+
+                point_count = self.point_count.get().strip()
+                if len(point_count) == 0:
+                        tk.messagebox.showerror("Error", "Empty point count")
+                        return
+                try:
+                        point_count = parse_integer(point_count)
+                except Exception as e:
+                        tk.messagebox.showerror("Error", "{0}".format(e))
+                        return
+                if point_count <= 0:
+                        tk.messagebox.showerror("Error", "Point count must be positive")
+                        return
+
+                self.compute(self.filename_open.get(), self.filename_save.get(), point_count)
+
+        def cancel_button(self):
+
+                self.cancel.set()
+                self.status.set("Cancelling...")
+
+        def close_window(self):
+
+                if self.thread is None:
+                        self.root.destroy()
+                        return
+
+                # Окно закрывается после завершения потока, чтобы удалился недописанный файл
+                self.closing = True
+                self.cancel_button()
+
+        # Вычисление в отдельном потоке, чтобы окно не останавливалось.
+        # Поток передаёт сообщения через очередь, окно проверяет её
+        # каждые WINDOW_POLL_INTERVAL мс.
+        def compute(self, file_open, file_save, point_count):
+
+                self.cancel = threading.Event()
+                self.messages = queue.Queue()
+
+                self.run.config(state = tk.DISABLED)
+                self.stop.config(state = tk.NORMAL)
+                self.progress_bar["value"] = 0
+                self.status.set("Loading...")
+
+                self.thread = threading.Thread(target = self.compute_thread,
+                                               args = (file_open, file_save, point_count, self.cancel, self.messages))
+                self.thread.start()
+
+                self.root.after(WINDOW_POLL_INTERVAL, self.poll_messages)
+
+        @staticmethod
+        def compute_thread(file_open, file_save, point_count, cancel, messages):
+
+                start = time.perf_counter()
+
+                def progress(stage, done, count):
+                        if cancel.is_set():
+                                raise ObjSamplesCancelled("Cancelled")
+                        messages.put(("progress", stage, done, count, time.perf_counter() - start))
+
+                try:
+                        all_point_count = sample_obj_file(file_open, file_save, point_count, progress = progress)
+                except ObjSamplesCancelled:
+                        messages.put(("cancelled",))
+                except Exception as e:
+                        messages.put(("error", "{0}".format(e)))
+                else:
+                        messages.put(("done", all_point_count, time.perf_counter() - start))
+
+        def show_progress(self, stage, done, count, duration):
+
+                self.progress_bar["value"] = 100 * done / count
+
+                if stage == "load":
+                        self.status.set("Loading {0:.0f}%".format(100 * done / count))
+                        self.sample_start = duration
+                        return
+
+                # Скорость без времени разбора файла
+                sample_duration = duration - (self.sample_start or 0)
+                speed = done / sample_duration if sample_duration > 0 else 0
+
+                self.status.set("Sampling {0:.0f}%, {1} of {2} samples, {3:.0f} samples/s"\
+                                .format(100 * done / count, done, count, speed))
+
+        def poll_messages(self):
+
+                while True:
+
+                        try:
+                                message = self.messages.get_nowait()
+                        except queue.Empty:
+                                self.root.after(WINDOW_POLL_INTERVAL, self.poll_messages)
+                                return
+
+                        if message[0] == "progress":
+                                self.show_progress(*message[1:])
+                                continue
+
+                        break
+
+                self.thread.join()
+                self.thread = None
+                self.sample_start = None
+
+                self.run.config(state = tk.NORMAL)
+                self.stop.config(state = tk.DISABLED)
+
+                if self.closing:
+                        self.root.destroy()
+                        return
+
+                if message[0] == "done":
+                        self.progress_bar["value"] = 100
+                        self.status.set("{0} samples, {1:.1f} s".format(message[1], message[2]))
+                        tk.messagebox.showinfo("Information", "{0} samples generated".format(message[1]))
+                elif message[0] == "cancelled":
+                        self.progress_bar["value"] = 0
+                        self.status.set("Cancelled")
+                else:
+                        self.progress_bar["value"] = 0
+                        self.status.set("Error")
+                        tk.messagebox.showerror("Error", message[1])
+
+        @staticmethod
+        def set_style():
+
+                style = tk.ttk.Style()
+
+                if "xpnative" in style.theme_names():
+                        style.theme_use("xpnative")
+                elif "aqua" in style.theme_names():
+                        style.theme_use("aqua")
+                elif "clam" in style.theme_names():
+                        style.theme_use("clam")
+
+        def __init__(self):
+
+                root = tk.Tk()
+
+                self.root = root
+                self.thread = None
+                self.closing = False
+                self.sample_start = None
+
+                self.set_style()
+
+                root.title("OBJ file samples")
+                root.resizable(width=True, height=False)
+                root.minsize(width=700, height=0)
+
+                frame = tk.Frame(root, padx=5, pady=5)
+
+                frame.pack(fill=tk.BOTH, expand=tk.YES)
+
+                tk.Label(frame, text = 'File OBJ:').grid(row=0, column=0)
+                self.filename_open = tk.StringVar()
+                tk.Entry(frame, textvariable=self.filename_open).grid(row=0, column=1, sticky='ew')
+                tk.Button(frame, text='...', command=self.open_button).grid(row=0, column=2)
+
+                tk.Label(frame, text='File Samples:').grid(row=1, column=0)
+                self.filename_save = tk.StringVar()
+                tk.Entry(frame, textvariable=self.filename_save).grid(row=1, column=1, sticky='ew')
+                tk.Button(frame, text='...', command=self.save_button).grid(row=1, column=2)
+
+                tk.Label(frame, text = 'Sample Count:').grid(row=2, column=0)
+                self.point_count = tk.StringVar()
+                tk.Entry(frame, textvariable=self.point_count).grid(row=2, column=1, sticky='ew')
+
+                tk.Grid.rowconfigure(frame, 0, weight=1)
+                tk.Grid.rowconfigure(frame, 1, weight=1)
                 tk.Grid.rowconfigure(frame, 2, weight=1)
                 tk.Grid.columnconfigure(frame, 0, weight=0)
                 tk.Grid.columnconfigure(frame, 1, weight=1)
                 tk.Grid.columnconfigure(frame, 2, weight=0)
 
-                tk.Button(root, text = 'Generate samples', command=self.run_button).pack()
+                self.progress_bar = tk.ttk.Progressbar(frame, mode = 'determinate', maximum = 100)
+                self.progress_bar.grid(row=3, column=0, columnspan=3, sticky='ew')
+
+                self.status = tk.StringVar()
+                tk.Label(frame, textvariable=self.status, anchor='w').grid(row=4, column=0, columnspan=3, sticky='ew')
+
+                buttons = tk.Frame(root)
+                buttons.pack()
+
+                self.run = tk.Button(buttons, text = 'Generate samples', command=self.run_button)
+                self.run.pack(side=tk.LEFT)
+
+                self.stop = tk.Button(buttons, text = 'Cancel', command=self.cancel_button, state=tk.DISABLED)
+                self.stop.pack(side=tk.LEFT)
+
+                root.protocol("WM_DELETE_WINDOW", self.close_window)
 
 def dialog():
 
@@ -525,14 +2459,580 @@ def dialog():
 
         tk.mainloop()
 
+class ObjFileSamplesTestCase(unittest.TestCase):
+
+        OBJ_TEXT = "v 0 0 0\nv 1 0 0\nv 0 1 0\nv 1 1 0\nf 1 2 3\nf 2 4 3\n"
+
+        @staticmethod
+        def write_obj_file(text):
+
+                with tempfile.NamedTemporaryFile("w", suffix = ".obj", delete = False) as f:
+                        f.write(text)
+                        return f.name
+
+        def setUp(self):
+
+                self.file_name = self.write_obj_file(self.OBJ_TEXT)
+
+        def tearDown(self):
+
+                os.remove(self.file_name)
+
+        def test_samples(self):
+
+                file = ObjFile(self.file_name)
+
+                samples = file.samples(1000, np.random.default_rng(1))
+
+                self.assertEqual(samples.shape, (1000, 3))
+                self.assertTrue(np.all(np.abs(samples[:, 0:2]) <= 1))
+                self.assertTrue(np.all(samples[:, 2] == 0))
+
+                # Первая половина точек в треугольнике (1, 2, 3), вторая в (2, 4, 3)
+                self.assertTrue(np.all(samples[:500, 0] + samples[:500, 1] <= 1e-12))
+                self.assertTrue(np.all(samples[500:, 0] + samples[500:, 1] >= -1e-12))
+
+        def test_zero_area_triangles(self):
+
+                file_name = self.write_obj_file(self.OBJ_TEXT + "f 1 1 2\nf 1 2 3\nf 3 3 3\n")
+
+                try:
+                        file = ObjFile(file_name)
+                finally:
+                        os.remove(file_name)
+
+                self.assertEqual(len(file.samples(3, np.random.default_rng(1))), 3)
+
+        def test_read_chunks(self):
+
+                text = "# OBJ\n  v 0 0 0\nv 1 0 0\r\nvt 1 1\nv 0 1 0\nf 1/1/1 2//2 3\nv 1 1 0\nf -3 -1 -2\n"
+
+                file_name = self.write_obj_file(text)
+
+                try:
+                        for chunk_size in (None, 1, 7, OBJ_CHUNK_SIZE):
+                                chunks = list(ObjFile.read_chunks(file_name, chunk_size))
+                                vertices = np.concatenate([vertices for vertices, _ in chunks])
+                                faces = np.concatenate([faces for _, faces in chunks])
+                                self.assertEqual(vertices.tolist(), [[0, 0, 0], [1, 0, 0], [0, 1, 0], [1, 1, 0]])
+                                self.assertEqual(faces.tolist(), [[0, 1, 2], [1, 3, 2]])
+                finally:
+                        os.remove(file_name)
+
+        def test_read_errors(self):
+
+                texts = {"v 0 0\n": "Error vertex line \"0 0\"",
+                         "v 0 0 0\nf 1 1\n": "Error face line \"1 1\"",
+                         "v 0 0 0\nf 1 1 1 5\n": "Triangle index abs(5) is out of range [1, 1]",
+                         "v 0 0 0\nf 1 1 2\nv 0 0 0\n": "Triangle index abs(2) is out of range [1, 1]",
+                         "v 0 0 0\nf 1 1 -2\n": "Triangle index abs(-2) is out of range [1, 1]",
+                         "v 0 0 0\nf 1 /1 1\n": "Error face element \"/1\"",
+                         "v 0 0 0\nv nan 0 0\nv 0 1 0\nf 1 2 3\n": "Vertex coordinates are not finite",
+                         "v 0 0 0\nv 1 0 0\nv 0 inf 0\nf 1 2 3\n": "Vertex coordinates are not finite"}
+
+                for text, message in texts.items():
+
+                        file_name = self.write_obj_file(text)
+
+                        try:
+                                with self.assertRaises(ObjSamplesException) as context:
+                                        ObjFile(file_name)
+                        finally:
+                                os.remove(file_name)
+
+                        self.assertEqual(str(context.exception), message)
+
+        def test_polygons(self):
+
+                text = "v 0 0 0\nv 1 0 0\nv 1 1 0\nv 0 1 0\nv 2 0 0\nv 2 1 0\nv 3 0 0\nv 3 1 0\n"\
+                       "f 1/1 2/2 3/3 4/4\nf 2 5 6\nf -4 -2 -1 -3 6\n"
+
+                file_name = self.write_obj_file(text)
+
+                try:
+                        file = ObjFile(file_name)
+                finally:
+                        os.remove(file_name)
+
+                self.assertTrue(np.array_equal(file.faces(), [[0, 1, 2], [0, 2, 3], [1, 4, 5],
+                                                              [4, 6, 7], [4, 7, 5]]))
+
+                # Первый квадрат — 1 из 2.5 единиц площади, после нормализации x < -1/3
+                samples = file.samples(30000, np.random.default_rng(1), exact_count = True)
+                self.assertAlmostEqual(np.mean(samples[:, 0] < -1 / 3), 0.4, delta = 0.02)
+
+        def test_attributes(self):
+
+                text = "v 0 0 0\nv 1 0 0\nv 1 1 0\nv 0 1 0\nv 2 0 0\nv 2 0 1\n"\
+                       "vt 0 0\nvt 1 0\nvt 1 1 0\nvt 0 1\nvn 0 0 2\nvn 0 0 1\n"\
+                       "f 1/1/1 2/2/2 3/3/-1 4/4/1\nf 2//-2 5//2 6//2\nf 2 5 3\n"
+
+                file_name = self.write_obj_file(text)
+
+                try:
+                        file = ObjFile(file_name, attributes = True)
+
+                        cached = ObjFile(file_name, cache = True, attributes = True)
+                        cached = ObjFile(file_name, cache = True, attributes = True)
+
+                        for name, array in file.attributes().items():
+                                self.assertTrue(np.array_equal(cached.attributes()[name], array))
+
+                        sample_file_name = file_name + ".npy"
+                        try:
+                                file.write_samples_to_file(sample_file_name, 1000, random_generator = np.random.default_rng(1),
+                                                           exact_count = True, attributes = True)
+                                self.assertEqual(np.load(sample_file_name).shape, (1000, SAMPLE_ATTRIBUTE_COLUMNS))
+                        finally:
+                                os.remove(sample_file_name)
+                finally:
+                        os.remove(file_name)
+                        os.remove(file_name + ObjCache.SUFFIX)
+
+                self.assertTrue(np.array_equal(file.attributes()["face_normals"], [[0, 1, 1], [0, 1, 0], [0, 1, 1],
+                                                                                  [-1, -1, -1]]))
+                self.assertTrue(np.array_equal(file.attributes()["face_texture_coordinates"],
+                                               [[0, 1, 2], [0, 2, 3], [-1, -1, -1], [-1, -1, -1]]))
+
+                samples, triangles, normals, texture_coordinates = next(file.sample_blocks(
+                        1000, random_generator = np.random.default_rng(1), exact_count = True,
+                        triangles = True, normals = True, texture_coordinates = True))
+
+                self.assertTrue(np.allclose(np.linalg.norm(normals, axis = 1), 1))
+
+                square = triangles < 2
+                self.assertTrue(np.allclose(normals[square], [0, 0, 1]))
+                # Нормализация вершин — сдвиг на (1, 0.5, 0.5), текстурные координаты равны x, y
+                self.assertTrue(np.allclose(texture_coordinates[square], samples[square, :2] + [1, 0.5]))
+                self.assertTrue(np.all(np.isnan(texture_coordinates[~square])))
+
+                # Нормаль плоскости треугольника без нормалей вершин
+                self.assertTrue(np.allclose(np.abs(normals[triangles == 3]), [0, 0, 1]))
+
+                with self.assertRaises(ObjSamplesException):
+                        next(ObjFile(self.file_name).sample_blocks(10, normals = True))
+
+                texts = {"v 0 0 0\nvn 0 0\n": "Error vertex normal line \"0 0\"",
+                         "v 0 0 0\nvt\n": "Error texture coordinate line \"\"",
+                         "v 0 0 0\nvn 0 0 1\nf 1//1 1//2 1//1\n": "Normal index abs(2) is out of range [1, 1]",
+                         "v 0 0 0\nf 1/1 1/1 1/1\n": "Texture coordinate index abs(1) is out of range [1, 0]"}
+
+                for text, message in texts.items():
+
+                        file_name = self.write_obj_file(text)
+
+                        try:
+                                with self.assertRaises(ObjSamplesException) as context:
+                                        ObjFile(file_name, attributes = True)
+                        finally:
+                                os.remove(file_name)
+
+                        self.assertEqual(str(context.exception), message)
+
+        def test_cache(self):
+
+                cache_file_name = self.file_name + ObjCache.SUFFIX
+
+                try:
+                        samples = ObjFile(self.file_name, cache = True).samples(10, np.random.default_rng(1))
+                        self.assertTrue(os.path.isfile(cache_file_name))
+
+                        cache_samples = ObjFile(self.file_name, cache = True).samples(10, np.random.default_rng(1))
+                        self.assertTrue(np.array_equal(samples, cache_samples))
+
+                        # Изменилось только время изменения файла, хеш вычисляется один раз
+                        stat = os.stat(self.file_name)
+                        os.utime(self.file_name, ns = (stat.st_atime_ns, stat.st_mtime_ns + 10**9))
+                        with unittest.mock.patch.object(ObjCache, "file_hash", wraps = ObjCache.file_hash) as file_hash:
+                                self.assertIsNotNone(ObjCache(self.file_name).read())
+                                self.assertIsNotNone(ObjCache(self.file_name).read())
+                        self.assertEqual(file_hash.call_count, 1)
+
+                        with open(self.file_name, "a") as f:
+                                f.write("v 2 2 0\nf 2 5 4\n")
+
+                        samples = ObjFile(self.file_name, cache = True).samples(3, np.random.default_rng(1))
+                        self.assertEqual(len(samples), 3)
+                finally:
+                        if os.path.exists(cache_file_name):
+                                os.remove(cache_file_name)
+
+        def test_file_formats(self):
+
+                file = ObjFile(self.file_name)
+
+                samples = file.samples(100, np.random.default_rng(1))
+
+                text = "".join("{:9.6f} {:9.6f} {:9.6f}\n".format(*sample) for sample in samples)
+                self.assertEqual(samples_to_text(samples), text)
+
+                read_functions = {"text": np.loadtxt,
+                                  "float32": lambda f: np.fromfile(f, dtype = np.float32).reshape(-1, 3),
+                                  "float64": lambda f: np.fromfile(f, dtype = np.float64).reshape(-1, 3),
+                                  "npy": np.load,
+                                  "npz": lambda f: np.load(f)["samples"]}
+
+                for file_format, read_function in read_functions.items():
+
+                        with tempfile.TemporaryDirectory() as directory:
+                                sample_file_name = os.path.join(directory, "samples" + SAMPLE_FILE_FORMATS[file_format])
+                                file.write_samples_to_file(sample_file_name, 100, None, np.random.default_rng(1))
+                                file_samples = read_function(sample_file_name)
+
+                        self.assertEqual(file_samples.shape, samples.shape)
+                        self.assertTrue(np.allclose(file_samples, samples, atol = 1e-6))
+
+        def test_parallel(self):
+
+                file = ObjFile(self.file_name)
+
+                with tempfile.TemporaryDirectory() as directory:
+
+                        samples = []
+
+                        for process_count in (1, 2, 3):
+                                sample_file_name = os.path.join(directory, "samples_{0}.npy".format(process_count))
+                                # 2 треугольника по 500 точек, 16 частей
+                                with unittest.mock.patch(__name__ + ".SAMPLE_SHARD_SIZE", 64):
+                                        count = file.write_samples_to_file(sample_file_name, 1000, None,
+                                                                           np.random.default_rng(1), process_count)
+                                samples.append(np.load(sample_file_name))
+                                self.assertEqual(samples[-1].shape, (count, 3))
+
+                        # Файлы частей удалены
+                        self.assertEqual(len(os.listdir(directory)), 3)
+
+                self.assertTrue(np.array_equal(samples[0], samples[1]))
+                self.assertTrue(np.array_equal(samples[0], samples[2]))
+
+        def test_progress(self):
+
+                file_name = self.write_obj_file(self.OBJ_TEXT * 10)
+                sample_file_name = file_name + ".f32"
+
+                messages = []
+
+                def progress(stage, done, count):
+                        messages.append((stage, done, count))
+                        if stage == "sample" and done > SAMPLE_BLOCK_SIZE:
+                                raise ObjSamplesCancelled("Cancelled")
+
+                try:
+                        count = sample_obj_file(file_name, sample_file_name, 10, cache = False, progress = progress)
+                        self.assertEqual(messages, [("load", len(self.OBJ_TEXT) * 10, len(self.OBJ_TEXT) * 10),
+                                                    ("sample", count, count)])
+
+                        for process_count in (1, 2):
+                                messages.clear()
+                                with self.assertRaises(ObjSamplesCancelled):
+                                        sample_obj_file(file_name, sample_file_name, 3 * SAMPLE_BLOCK_SIZE, cache = False,
+                                                        process_count = process_count, exact_count = True,
+                                                        progress = progress)
+                                self.assertFalse(os.path.exists(sample_file_name))
+                                self.assertEqual(messages[-1][0], "sample")
+                                self.assertLess(messages[-1][1], 3 * SAMPLE_BLOCK_SIZE)
+                finally:
+                        os.remove(file_name)
+
+        def test_batch(self):
+
+                with tempfile.TemporaryDirectory() as directory:
+
+                        for name in ("a.obj", "b.obj"):
+                                with open(os.path.join(directory, name), "w") as f:
+                                        f.write(self.OBJ_TEXT)
+
+                        manifest = os.path.join(directory, "manifest.json")
+                        with open(manifest, "w") as f:
+                                json.dump([{"obj_file": "a.obj", "sample_file": "a.npy", "sample_count": 100, "seed": 1},
+                                           {"obj_file": "a.obj", "sample_file": "a.txt", "sample_count": 10},
+                                           {"obj_file": "c.obj", "sample_file": "c.txt", "sample_count": 10}], f)
+
+                        jobs = read_batch_manifest(manifest)
+
+                        for process_count in (1, 2):
+                                results = sample_obj_files(jobs, process_count, force = True)
+                                self.assertEqual([result["status"] for result in results], ["done", "done", "error"])
+                                self.assertGreater(results[0]["load time"], 0)
+                                self.assertEqual(results[1]["load time"], 0)
+                                self.assertEqual(results[0]["samples"], 100)
+
+                        samples = np.load(os.path.join(directory, "a.npy"))
+                        self.assertTrue(np.array_equal(samples, ObjFile(os.path.join(directory, "a.obj"))\
+                                                       .samples(100, np.random.default_rng(1))))
+
+                        results = sample_obj_files(jobs[:2], 1)
+                        self.assertEqual([result["status"] for result in results], ["up to date", "up to date"])
+
+                        os.utime(os.path.join(directory, "a.obj"), ns = (0, 0))
+                        results = sample_obj_files(jobs[:2] + batch_jobs_from_pattern(
+                                os.path.join(directory, "b.*"), 10, "float32"), 1)
+                        self.assertEqual([result["status"] for result in results], ["done", "done", "done"])
+                        self.assertTrue(os.path.isfile(os.path.join(directory, "b.f32")))
+
+                        self.assertIn("3 jobs: 3 done", batch_report(results, 1))
+
+                        with self.assertRaises(ObjSamplesException):
+                                batch_job("a.obj", "a.txt", 10, count = 1)
+
+                        # Неожиданная ошибка одного задания
+                        write_samples_to_file = ObjFile.write_samples_to_file
+
+                        def write_samples(file, file_name, *args, **kwargs):
+                                if file_name.endswith(".npy"):
+                                        raise ValueError("Test error")
+                                return write_samples_to_file(file, file_name, *args, **kwargs)
+
+                        with unittest.mock.patch.object(ObjFile, "write_samples_to_file", write_samples):
+                                results = run_batch_jobs(jobs[:2])
+
+                        self.assertEqual([result["status"] for result in results], ["error", "done"])
+                        self.assertEqual((results[0]["error"], results[0]["message"]), ("ValueError", "Test error"))
+                        self.assertIn("ValueError: Test error", batch_report(results, 1))
+
+        def test_shards(self):
+
+                counts = np.array([3, 0, 5, 1, 1, 7, 2])
+
+                def shards(shard_size):
+                        return [(begin, end, shard_counts.tolist())
+                                for begin, end, shard_counts in sample_shards(counts, shard_size)]
+
+                self.assertEqual(shards(100), [(0, 7, counts.tolist())])
+                self.assertEqual(shards(7), [(0, 3, [3, 0, 5]), (3, 6, [1, 1, 7]), (6, 7, [2])])
+
+                # Треугольники с количеством точек больше размера части делятся
+                self.assertEqual(shards(4), [(0, 2, [3, 0]), (2, 3, [4]), (2, 3, [1]), (3, 5, [1, 1]),
+                                             (5, 6, [4]), (5, 6, [3]), (6, 7, [2])])
+
+                self.assertTrue(all(np.sum(shard_counts) <= 2 * 2 for begin, end, shard_counts
+                                    in sample_shards(counts, 2)))
+                self.assertEqual(sum(np.sum(shard_counts) for begin, end, shard_counts in sample_shards(counts, 2)),
+                                 np.sum(counts))
+
+        def test_exact_count(self):
+
+                file = ObjFile(self.file_name)
+
+                for sample_count in (1, 7, 1000):
+                        samples = file.samples(sample_count, np.random.default_rng(1), exact_count = True)
+                        self.assertEqual(samples.shape, (sample_count, 3))
+
+                # Треугольники одинаковой площади
+                samples = file.samples(100000, np.random.default_rng(1), exact_count = True)
+                first = np.count_nonzero(samples[:, 0] + samples[:, 1] < 0)
+                self.assertTrue(abs(first - 50000) < 1000)
+
+        def test_samplers(self):
+
+                counts = np.array([1, 4, 9, 5, 0, 16, 3])
+
+                for sampler, function in SAMPLERS.items():
+
+                        points = function(counts, np.random.default_rng(1))
+
+                        self.assertEqual(points.shape, (np.sum(counts), 2), sampler)
+                        self.assertTrue(np.all((points >= 0) & (points < 1)), sampler)
+
+                        if sampler in ("stratified_jittered", "latin_hypercube"):
+                                for begin, end in zip(np.cumsum(counts) - counts, np.cumsum(counts)):
+                                        n = end - begin
+                                        if sampler == "latin_hypercube":
+                                                cells = np.floor(points[begin:end] * n).astype(int)
+                                                self.assertEqual(len(set(cells[:, 0])), n)
+                                                self.assertEqual(len(set(cells[:, 1])), n)
+                                        else:
+                                                m = int(np.ceil(np.sqrt(n)))
+                                                cells = np.floor(points[begin:end] * m).astype(int)
+                                                self.assertEqual(len(set(map(tuple, cells))), n)
+
+                file = ObjFile(self.file_name)
+
+                for sampler in SAMPLERS:
+                        samples = file.samples(1000, np.random.default_rng(1), sampler = sampler)
+                        self.assertEqual(samples.shape, (1000, 3))
+                        self.assertTrue(np.all(samples[:500, 0] + samples[:500, 1] <= 1e-12))
+
+        def test_incremental(self):
+
+                with tempfile.TemporaryDirectory() as directory:
+
+                        sample_file_name = os.path.join(directory, "samples.npy")
+
+                        file = ObjFile(self.file_name)
+                        file.write_samples_to_file(sample_file_name, 100, None, np.random.default_rng(1), incremental = True)
+                        samples = np.load(sample_file_name)
+
+                        file.write_samples_to_file(sample_file_name, 100, None, np.random.default_rng(2), incremental = True)
+                        self.assertTrue(np.array_equal(np.load(sample_file_name), samples))
+
+                        # Новая вершина изменяет нормализацию, новый треугольник
+                        # с площадью, равной площади двух старых треугольников
+                        with open(self.file_name, "a") as f:
+                                f.write("v 3 3 0\nf 2 5 4\n")
+
+                        file = ObjFile(self.file_name)
+                        file.write_samples_to_file(sample_file_name, 200, None, np.random.default_rng(3), incremental = True)
+                        new_samples = np.load(sample_file_name)
+
+                self.assertEqual(new_samples.shape, (200, 3))
+                self.assertTrue(np.allclose(new_samples[:100, 0:2], ((samples[:, 0:2] / 2 + 0.5) - 1.5) * 2 / 3))
+
+        def test_incremental_edit(self):
+
+                # Сетка 10 × 10 квадратов по 2 треугольника с неровной высотой.
+                # Одна вершина поднимается, при этом границы вершин не изменяются
+                # из-за вершины вне треугольников, а общая площадь изменяется.
+                def write(file_name, edited_z):
+                        with open(file_name, "w") as f:
+                                for i in range(11):
+                                        for j in range(11):
+                                                z = 0.1 * ((i * 7 + j * 3) % 5) / 4
+                                                if (i, j) == (9, 9):
+                                                        z = edited_z
+                                                f.write("v {0} {1} {2}\n".format(i, j, z))
+                                for i in range(10):
+                                        for j in range(10):
+                                                v = i * 11 + j + 1
+                                                f.write("f {0} {1} {2}\nf {1} {3} {2}\n".format(v, v + 11, v + 1, v + 12))
+                                f.write("v 0 0 3\n")
+
+                with tempfile.TemporaryDirectory() as directory:
+
+                        obj_file_name = os.path.join(directory, "grid.obj")
+                        sample_file_name = os.path.join(directory, "samples.npy")
+
+                        write(obj_file_name, 0.0)
+                        ObjFile(obj_file_name).write_samples_to_file(sample_file_name, 10000, None,
+                                                                      np.random.default_rng(1), incremental = True)
+                        samples = np.load(sample_file_name)
+
+                        write(obj_file_name, 3.0)
+                        file = ObjFile(obj_file_name)
+                        count = file.write_samples_to_file(sample_file_name, 10000, None,
+                                                           np.random.default_rng(2), incremental = True)
+                        new_samples = np.load(sample_file_name)
+
+                self.assertEqual(new_samples.shape, (count, 3))
+
+                # Количество точек изменилось у многих треугольников
+                old_samples = set(map(tuple, samples.tolist()))
+                reused = sum(1 for sample in new_samples.tolist() if tuple(sample) in old_samples)
+                self.assertNotEqual(count, len(samples))
+                # Изменились 6 треугольников из 200
+                self.assertGreater(reused, 0.85 * count)
+
+        def test_match_keys(self):
+
+                old_keys = np.array([5, 3, 9, 3, 7], dtype = np.uint64)
+                keys = np.array([7, 3, 1, 5, 9, 9], dtype = np.uint64)
+
+                self.assertEqual(match_keys(old_keys, keys).tolist(), [4, -1, -1, 0, -1, -1])
+
+        def test_sample_blocks(self):
+
+                file = ObjFile(self.file_name)
+
+                samples = file.samples(1000, np.random.default_rng(1), sampler = "latin_hypercube")
+
+                blocks = list(file.sample_blocks(1000, 300, np.random.default_rng(1), sampler = "latin_hypercube"))
+                self.assertEqual([len(block) for block in blocks], [300, 300, 300, 100])
+                self.assertTrue(np.array_equal(np.concatenate(blocks), samples))
+
+                blocks = list(file.sample_blocks(1000, 128, np.random.default_rng(1), sampler = "latin_hypercube",
+                                                 triangles = True, barycentrics = True))
+
+                block_samples, triangles, barycentrics = map(np.concatenate, zip(*blocks))
+                self.assertTrue(np.array_equal(block_samples, samples))
+                self.assertEqual(triangles.tolist(), [0] * 500 + [1] * 500)
+
+                vertices = file.vertices()[file.faces()[triangles]]
+                self.assertTrue(np.allclose(np.einsum("ij,ijk->ik", barycentrics, vertices), samples))
+
+        def test_fixed_size_blocks(self):
+
+                parts = [(np.arange(0, 5),), (np.arange(5, 7),), (np.arange(7, 20),)]
+
+                blocks = [block.tolist() for block, in fixed_size_blocks(parts, 6)]
+
+                self.assertEqual(blocks, [list(range(0, 6)), list(range(6, 12)), list(range(12, 18)), [18, 19]])
+
+        def test_statistics(self):
+
+                for dtype in (np.float32, np.float64):
+
+                        file = ObjFile(self.file_name, dtype = dtype)
+
+                        self.assertEqual(file.vertices().dtype, dtype)
+                        self.assertEqual(file.vertices().tolist(), [[-1, -1, 0], [1, -1, 0], [-1, 1, 0], [1, 1, 0]])
+
+                        statistics = file.statistics(percentiles = (10, 90), bins = 4)
+
+                        self.assertEqual(statistics["triangle count"], 2)
+                        self.assertEqual(statistics["area all"], 4)
+                        self.assertEqual(statistics["area median"], 2)
+                        self.assertEqual(statistics["area percentiles"], {10: 2, 90: 2})
+                        self.assertEqual(sum(count for _, _, count in statistics["area histogram"]), 2)
+
+        def test_random_generator(self):
+
+                file = ObjFile(self.file_name)
+
+                samples_1 = file.samples(100, np.random.default_rng(1))
+                samples_2 = file.samples(100, np.random.default_rng(1))
+
+                self.assertTrue(np.array_equal(samples_1, samples_2))
+
+        def test_profiler(self):
+
+                profiler = Profiler(use_tracemalloc = True)
+
+                profiler.start()
+
+                with profiler.stage("outer"):
+                        with profiler.stage("inner"):
+                                time.sleep(0.01)
+                        data = np.zeros(1000000)
+                        del data
+
+                file = ObjFile(self.file_name, profiler = profiler)
+
+                sample_file_name = self.file_name + ".txt"
+                try:
+                        file.write_samples_to_file(sample_file_name, 100, random_generator = np.random.default_rng(1),
+                                                   exact_count = True, profiler = profiler)
+                finally:
+                        os.remove(sample_file_name)
+
+                profiler.stop()
+
+                report = json.loads(profiler.json_report())
+
+                stages = report["stages"]
+
+                for name in ("parse", "index correction", "normalize", "area", "counts", "sample", "write"):
+                        self.assertIn(name, stages)
+
+                self.assertGreaterEqual(stages["inner"]["time"], 0.01)
+                self.assertEqual(stages["inner"]["parent"], "outer")
+                self.assertIsNone(stages["outer"]["parent"])
+                self.assertEqual(stages["sample"]["parent"], "write")
+                self.assertGreaterEqual(stages["outer"]["memory peak"], 8000000)
+                self.assertLessEqual(sum(stage["time"] for stage in stages.values()), report["total time"])
+
+                self.assertEqual(report["counters"]["faces"], 2)
+                self.assertEqual(report["counters"]["samples"], 100)
+
 if __name__ == "__main__":
 
         try:
 
-                if len(sys.argv) == 4:
+                if len(sys.argv) > 1 and sys.argv[1] == "batch":
+                        run_batch(sys.argv[2:])
+                elif len(sys.argv) in (4, 5):
                         sample_obj_file(*sys.argv[1:])
                 else:
-                        #error("Usage: obj_file sample_file sample_count")
+                        #error("Usage: obj_file sample_file sample_count [text|float32|float64|npy|npz]")
                         dialog()
 
                 # test_triangle_samples(1000)
@@ -0,0 +1,147 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+
+# Время этапов вычисления точек файлов OBJ на созданных файлах OBJ
+# увеличивающегося размера. Для каждого размера выводится одна строка
+# JSON с временем и пиковой памятью этапов и счётчиками, чтобы
+# сравнивать результаты разных версий программы.
+#
+# obj_file_samples_benchmark.py [max_triangle_count [sample_count [format [profile]]]]
+#
+# profile — cprofile (самые долгие функции) или tracemalloc (пиковая
+# память этапов). Оба сильно замедляют вычисления, поэтому время
+# с ними не сравнивается со временем без них.
+
+import sys
+import os
+import io
+import json
+import contextlib
+import tempfile
+import numpy as np
+import obj_file_samples
+
+if sys.version_info < (3, 6):
+        sys.exit("Python >= 3.6 is required.")
+
+TRIANGLE_COUNTS = (10**3, 10**4, 10**5, 10**6, 10**7)
+
+MAX_TRIANGLE_COUNT = 10**6
+
+SAMPLE_COUNT = 10**6
+
+# Доля треугольников нулевой площади
+DEGENERATE_FRACTION = 0.01
+
+PROFILES = (None, "cprofile", "tracemalloc")
+
+class BenchmarkException(Exception):
+        pass
+
+def error(message):
+        raise BenchmarkException(message)
+
+# Сетка из квадратов по 2 треугольника с шумом по z. Часть треугольников
+# вырожденные, часть строк граней с отрицательными индексами и в виде
+# "v/vt/vn", как в файлах из программ моделирования.
+def write_obj_file(file_name, triangle_count, random_generator):
+
+        size = max(1, int(np.sqrt(triangle_count / 2)))
+
+        x, y = np.meshgrid(np.arange(size + 1), np.arange(size + 1), indexing = "ij")
+        vertices = np.column_stack((x.ravel(), y.ravel(), random_generator.random(x.size)))
+
+        corners = (np.arange(size)[:, None] * (size + 1) + np.arange(size)).ravel()
+        faces = np.concatenate((np.column_stack((corners, corners + size + 1, corners + 1)),
+                                np.column_stack((corners + 1, corners + size + 1, corners + size + 2))))
+
+        degenerate = random_generator.random(len(faces)) < DEGENERATE_FRACTION
+        faces[degenerate, 2] = faces[degenerate, 1]
+
+        # Индексы с 1 и отрицательные индексы от конца списка вершин
+        negative = random_generator.random(len(faces)) < 0.5
+        indices = faces + 1
+        indices[negative] = faces[negative] - len(vertices)
+
+        with open(file_name, "w") as f:
+                f.write("# {0} triangles\n".format(len(faces)))
+                np.savetxt(f, vertices, fmt = "v %.6f %.6f %.6f")
+                f.write("vt 0 0\nvn 0 0 1\n")
+                slashes = random_generator.random(len(faces)) < 0.5
+                np.savetxt(f, indices[slashes], fmt = "f %d/1/1 %d/1/1 %d/1/1")
+                np.savetxt(f, indices[~slashes], fmt = "f %d %d %d")
+
+        return len(faces)
+
+def benchmark(triangle_count, sample_count, file_format, profile):
+
+        random_generator = np.random.default_rng(0)
+
+        with tempfile.TemporaryDirectory() as directory:
+
+                obj_file = os.path.join(directory, "mesh.obj")
+                sample_file = os.path.join(directory, "samples" + obj_file_samples.SAMPLE_FILE_FORMATS[file_format])
+
+                face_count = write_obj_file(obj_file, triangle_count, random_generator)
+
+                profiler = obj_file_samples.Profiler(use_cprofile = profile == "cprofile",
+                                                     use_tracemalloc = profile == "tracemalloc")
+
+                # Сообщения программы не смешиваются со строками JSON
+                with contextlib.redirect_stdout(io.StringIO()):
+                        profiler.start()
+                        try:
+                                file = obj_file_samples.ObjFile(obj_file, profiler = profiler)
+                                file.write_samples_to_file(sample_file, sample_count, file_format, random_generator,
+                                                           exact_count = True, profiler = profiler)
+                        finally:
+                                profiler.stop()
+
+                report = profiler.report()
+                report["triangle count"] = face_count
+                report["obj file size"] = os.path.getsize(obj_file)
+                report["sample count"] = sample_count
+                report["format"] = file_format
+                report["profile"] = profile
+
+                return report
+
+def get_positive_integer(text, name):
+
+        try:
+                value = int(text)
+        except ValueError:
+                error("Error {0} \"{1}\" conversion to integer".format(name, text))
+
+        if value <= 0:
+                error("{0} must be positive".format(name.capitalize()))
+
+        return value
+
+def run(argv):
+
+        if len(argv) > 5:
+                error("Usage: {0} [max_triangle_count [sample_count [format [profile]]]]".format(argv[0]))
+
+        max_triangle_count = get_positive_integer(argv[1], "triangle count") if len(argv) > 1 else MAX_TRIANGLE_COUNT
+        sample_count = get_positive_integer(argv[2], "sample count") if len(argv) > 2 else SAMPLE_COUNT
+        file_format = argv[3] if len(argv) > 3 else "float32"
+        profile = argv[4] if len(argv) > 4 else None
+
+        if file_format not in obj_file_samples.SAMPLE_FILE_FORMATS:
+                error("Unknown file format \"{0}\"".format(file_format))
+
+        if profile not in PROFILES:
+                error("Unknown profile \"{0}\"".format(profile))
+
+        for triangle_count in TRIANGLE_COUNTS:
+                if triangle_count > max_triangle_count:
+                        break
+                print(json.dumps(benchmark(triangle_count, sample_count, file_format, profile)), flush = True)
+
+if __name__ == "__main__":
+
+        try:
+                run(sys.argv)
+        except Exception as e:
+                sys.exit("{0}".format(e))
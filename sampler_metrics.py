@@ -0,0 +1,380 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+
+# Показатели качества точек семплеров из файлов программы show_samples.
+#  Стратификация: в каждом проходе по одной точке в каждой ячейке сетки
+#   для Stratified Jittered Sampler и по одной точке в каждой строке
+#   и каждом столбце для Latin Hypercube Sampler.
+#  Дискрепанс L2-star и центрированный L2 точек проходов.
+#  Расстояния до ближайших точек по k-d дереву.
+# Все вычисления над массивом точек (N, d) без циклов по точкам.
+# Проверка стратификации больших файлов — по проходам, без чтения
+# всего файла в память (sampler_metrics.py validate sample_file).
+
+import sys
+import os
+import tempfile
+import unittest
+import numpy as np
+import scipy.spatial
+import show_samples
+
+
+# Наибольшее количество точек прохода для вычисления дискрепанса.
+# Дискрепанс вычисляется по всем парам точек, поэтому для проходов
+# с большим количеством точек он оценивается по случайной части точек.
+DISCREPANCY_MAX_GROUP_SIZE = 4096
+
+# Наибольшее общее количество пар точек для вычисления дискрепанса.
+# Если пар во всех проходах больше, то дискрепанс оценивается
+# по части проходов, равномерно выбранных среди всех проходов.
+DISCREPANCY_MAX_PAIRS = 2**24
+
+# Наибольший размер в байтах промежуточного массива координат
+# пар точек (g, n, n, d) типа float64
+DISCREPANCY_BLOCK_BYTES = 2**26
+
+# Наибольшее количество точек, для которых ищутся ближайшие точки.
+# При большем количестве точек ближайшие точки ищутся для случайной
+# части точек среди всех точек.
+NEAREST_MAX_QUERY_POINTS = 2**20
+
+if sys.version_info < (3, 6):
+        sys.exit("Python >= 3.6 is required.")
+
+class SamplerMetricsException(Exception):
+        pass
+
+def error(message):
+        raise SamplerMetricsException(message)
+
+# Номера ячеек сетки grid_size по каждой координате. Точки с координатой 1
+# относятся к последней ячейке.
+def cell_indices(points, grid_size):
+
+        return np.minimum((points * grid_size).astype(np.int64), grid_size - 1)
+
+# Проверка того, что в каждом проходе в каждой ячейке (Stratified Jittered)
+# или в каждой строке и каждом столбце (Latin Hypercube) ровно одна точка.
+# Точки проходов идут подряд.
+def stratification(sampler_type, grid_size, points):
+
+        point_count, dimension = points.shape
+
+        size = show_samples.group_size(sampler_type, grid_size, dimension)
+
+        if point_count % size != 0:
+                error("Point count {0} is not a multiple of pass size {1}".format(point_count, size))
+
+        pass_count = point_count // size
+
+        passes = np.repeat(np.arange(pass_count), size)
+
+        cells = cell_indices(points, grid_size)
+
+        if sampler_type == show_samples.STRATIFIED_JITTERED_SAMPLER:
+                # Номер ячейки по всем координатам, затем номер прохода
+                strata = [passes * size + np.ravel_multi_index(tuple(cells.T), (grid_size,) * dimension)]
+                strata_count = size
+        else:
+                # Для каждой координаты отдельно номер строки и номер прохода
+                strata = [passes * grid_size + cells[:, i] for i in range(dimension)]
+                strata_count = grid_size
+
+        failed = np.zeros(pass_count, dtype = bool)
+
+        for s in strata:
+                counts = np.bincount(s, minlength = pass_count * strata_count).reshape(pass_count, strata_count)
+                failed |= np.any(counts != 1, axis = 1)
+
+        failed_passes = np.flatnonzero(failed)
+
+        return {"pass count": pass_count,
+                "failed pass count": len(failed_passes),
+                "first failed pass": int(failed_passes[0]) if len(failed_passes) > 0 else None}
+
+# Квадраты дискрепанса точек групп groups (G, n, d) по формулам
+# Warnock (L2-star) и Hickernell (centered L2). Сумма по парам точек
+# вычисляется частями по g групп, чтобы промежуточный массив
+# (g, n, n, d) float64 занимал не больше DISCREPANCY_BLOCK_BYTES байтов.
+def squared_discrepancies(groups):
+
+        group_count, n, dimension = groups.shape
+
+        star = np.empty(group_count)
+        centered = np.empty(group_count)
+
+        block = max(1, DISCREPANCY_BLOCK_BYTES // (n * n * dimension * 8))
+
+        for begin in range(0, group_count, block):
+
+                x = groups[begin : begin + block]
+
+                a = x[:, :, np.newaxis, :]
+                b = x[:, np.newaxis, :, :]
+
+                star_pairs = np.prod(1 - np.maximum(a, b), axis = -1)
+                star_points = np.prod(1 - x * x, axis = -1)
+
+                star[begin : begin + block] = 3.0 ** -dimension\
+                                              - 2.0 ** (1 - dimension) / n * np.sum(star_points, axis = 1)\
+                                              + np.sum(star_pairs, axis = (1, 2)) / (n * n)
+
+                z = np.abs(x - 0.5)
+                za = z[:, :, np.newaxis, :]
+                zb = z[:, np.newaxis, :, :]
+
+                centered_pairs = np.prod(1 + 0.5 * za + 0.5 * zb - 0.5 * np.abs(a - b), axis = -1)
+                centered_points = np.prod(1 + 0.5 * z - 0.5 * z * z, axis = -1)
+
+                centered[begin : begin + block] = (13 / 12) ** dimension\
+                                                  - 2 / n * np.sum(centered_points, axis = 1)\
+                                                  + np.sum(centered_pairs, axis = (1, 2)) / (n * n)
+
+        # Ошибки округления могут дать малые отрицательные значения
+        return np.maximum(star, 0), np.maximum(centered, 0)
+
+# Дискрепанс точек проходов по size точек. Для больших проходов
+# и большого количества проходов оценка, см. DISCREPANCY_MAX_GROUP_SIZE
+# и DISCREPANCY_MAX_PAIRS.
+def discrepancy(points, size, random_generator = None):
+
+        if random_generator is None:
+                random_generator = np.random.default_rng(0)
+
+        point_count, dimension = points.shape
+
+        assert point_count % size == 0
+
+        groups = points.reshape(-1, size, dimension)
+
+        estimated = False
+
+        if size > DISCREPANCY_MAX_GROUP_SIZE:
+                estimated = True
+                groups = groups[:, np.sort(random_generator.choice(size, DISCREPANCY_MAX_GROUP_SIZE, replace = False))]
+
+        group_count = len(groups)
+        evaluated_count = max(1, min(group_count, DISCREPANCY_MAX_PAIRS // groups.shape[1] ** 2))
+
+        if evaluated_count < group_count:
+                estimated = True
+                groups = groups[np.linspace(0, group_count - 1, evaluated_count).astype(np.int64)]
+
+        star, centered = squared_discrepancies(groups)
+
+        star = np.sqrt(star)
+        centered = np.sqrt(centered)
+
+        return {"evaluated pass count": len(groups),
+                "estimated": estimated,
+                "L2-star mean": float(np.mean(star)),
+                "L2-star max": float(np.max(star)),
+                "centered L2 mean": float(np.mean(centered)),
+                "centered L2 max": float(np.max(centered))}
+
+# Расстояния от каждой точки до ближайшей другой точки по k-d дереву
+# всех точек. Нормированные расстояния — в единицах среднего расстояния
+# между точками N^(-1/d), для сравнения разного количества точек.
+# Для большого количества точек оценка, см. NEAREST_MAX_QUERY_POINTS.
+def nearest_distances(points, random_generator = None):
+
+        if random_generator is None:
+                random_generator = np.random.default_rng(0)
+
+        point_count, dimension = points.shape
+
+        if point_count < 2:
+                error("Nearest distances require at least 2 points")
+
+        # Без балансировки дерево строится в несколько раз быстрее,
+        # а поиск для равномерно распределённых точек почти не медленнее
+        tree = scipy.spatial.cKDTree(points, balanced_tree = False, compact_nodes = False)
+
+        query_points = points
+        if point_count > NEAREST_MAX_QUERY_POINTS:
+                query_points = points[random_generator.choice(point_count, NEAREST_MAX_QUERY_POINTS, replace = False)]
+
+        distances, _ = tree.query(query_points, k = 2, workers = -1)
+        distances = distances[:, 1]
+
+        scale = point_count ** (1 / dimension)
+
+        return {"nearest estimated": len(query_points) < point_count,
+                "minimum distance": float(np.min(distances)),
+                "mean distance": float(np.mean(distances)),
+                "normalized minimum distance": float(np.min(distances) * scale),
+                "normalized mean distance": float(np.mean(distances) * scale),
+                "coincident point count": int(np.count_nonzero(distances == 0))}
+
+# Проверка стратификации файла по проходам с остановкой на первом
+# проходе с ошибкой. В памяти находится только один блок проходов.
+def validate_file(file_name, block_point_count = show_samples.PASS_BLOCK_POINT_COUNT):
+
+        sampler_type, grid_size, pass_size, blocks = show_samples.read_passes(file_name, block_point_count)
+
+        checked_pass_count = 0
+        failed_pass = None
+
+        for points in blocks:
+
+                result = stratification(sampler_type, grid_size, points)
+
+                if result["first failed pass"] is not None:
+                        failed_pass = checked_pass_count + result["first failed pass"]
+                        checked_pass_count = failed_pass + 1
+                        break
+
+                checked_pass_count += result["pass count"]
+
+        return {"sampler": sampler_type, "grid size": grid_size, "pass size": pass_size,
+                "checked pass count": checked_pass_count, "first failed pass": failed_pass}
+
+def metrics(sampler_type, grid_size, points):
+
+        points = np.asarray(points, dtype = np.float64)
+
+        size = show_samples.group_size(sampler_type, grid_size, points.shape[1])
+
+        result = {"sampler": sampler_type, "point count": len(points), "dimension": points.shape[1],
+                  "grid size": grid_size}
+
+        result.update(stratification(sampler_type, grid_size, points))
+        result.update(discrepancy(points, size))
+        result.update(nearest_distances(points))
+
+        return result
+
+def print_metrics(result):
+
+        for name, value in result.items():
+                print("{0} = {1}".format(name, value))
+
+class SamplerMetricsTestCase(unittest.TestCase):
+
+        @staticmethod
+        def stratified_points(grid_size, pass_count, random_generator):
+
+                cells = np.stack(np.meshgrid(np.arange(grid_size), np.arange(grid_size), indexing = "ij"), axis = -1)
+                cells = np.tile(cells.reshape(-1, 2), (pass_count, 1))
+
+                return (cells + random_generator.random(cells.shape)) / grid_size
+
+        @staticmethod
+        def latin_hypercube_points(grid_size, pass_count, random_generator):
+
+                rows = [np.concatenate([random_generator.permutation(grid_size) for i in range(pass_count)])
+                        for j in range(2)]
+
+                return (np.stack(rows, axis = -1) + random_generator.random((grid_size * pass_count, 2))) / grid_size
+
+        def test_stratification(self):
+
+                random_generator = np.random.default_rng(1)
+
+                points = self.stratified_points(4, 3, random_generator)
+                result = stratification(show_samples.STRATIFIED_JITTERED_SAMPLER, 4, points)
+                self.assertEqual((result["pass count"], result["failed pass count"]), (3, 0))
+
+                points[20] = points[21]
+                result = stratification(show_samples.STRATIFIED_JITTERED_SAMPLER, 4, points)
+                self.assertEqual((result["failed pass count"], result["first failed pass"]), (1, 1))
+
+                points = self.latin_hypercube_points(8, 3, random_generator)
+                result = stratification(show_samples.LATIN_HYPERCUBE_SAMPLER, 8, points)
+                self.assertEqual((result["pass count"], result["failed pass count"]), (3, 0))
+
+                points[17, 1] = points[16, 1]
+                result = stratification(show_samples.LATIN_HYPERCUBE_SAMPLER, 8, points)
+                self.assertEqual((result["failed pass count"], result["first failed pass"]), (1, 2))
+
+        def test_discrepancy(self):
+
+                random_generator = np.random.default_rng(1)
+
+                groups = random_generator.random((5, 20, 3))
+
+                star, centered = squared_discrepancies(groups)
+
+                # Непосредственно по определению для одной группы
+                x = groups[2]
+                n, d = x.shape
+                star_direct = 3.0 ** -d - 2.0 ** (1 - d) / n * np.sum(np.prod(1 - x * x, axis = 1))\
+                              + sum(np.prod(1 - np.maximum(x[i], x[j])) for i in range(n) for j in range(n)) / n**2
+                self.assertAlmostEqual(star[2], star_direct)
+
+                # Только для проверки, для вычислений достаточно scipy.spatial
+                import scipy.stats.qmc
+
+                # scipy возвращает L2-star без квадрата, а центрированный L2 в квадрате
+                for i in range(len(groups)):
+                        self.assertAlmostEqual(np.sqrt(star[i]), scipy.stats.qmc.discrepancy(groups[i], method = "L2-star"))
+                        self.assertAlmostEqual(centered[i], scipy.stats.qmc.discrepancy(groups[i], method = "CD"))
+
+                stratified = discrepancy(self.stratified_points(8, 2, random_generator), 64)
+                uniform = discrepancy(random_generator.random((128, 2)), 64)
+                self.assertLess(stratified["L2-star mean"], uniform["L2-star mean"])
+                self.assertFalse(stratified["estimated"])
+
+        def test_nearest_distances(self):
+
+                points = np.array([[0, 0], [0.5, 0], [0.5, 0.25], [1, 1], [1, 1]])
+
+                result = nearest_distances(points)
+
+                self.assertEqual(result["minimum distance"], 0)
+                self.assertEqual(result["coincident point count"], 2)
+                self.assertAlmostEqual(result["mean distance"], (0.5 + 0.25 + 0.25) / 5)
+
+        def test_validate_file(self):
+
+                points = self.stratified_points(4, 5, np.random.default_rng(1))
+
+                for bad_point, failed_pass in ((None, None), (50, 3)):
+
+                        if bad_point is not None:
+                                points[bad_point] = points[bad_point + 1]
+
+                        text = "Stratified Jittered Sampler\nPass count: 5\n"\
+                               + "".join("({0}, {1})\n".format(x, y) for x, y in points)
+
+                        with tempfile.NamedTemporaryFile("w", suffix = ".txt", delete = False) as f:
+                                f.write(text)
+
+                        try:
+                                result = validate_file(f.name, 32)
+                        finally:
+                                os.remove(f.name)
+
+                        self.assertEqual(result["first failed pass"], failed_pass)
+                        self.assertEqual(result["checked pass count"], 5 if failed_pass is None else failed_pass + 1)
+
+        def test_metrics(self):
+
+                points = self.stratified_points(4, 2, np.random.default_rng(1))
+
+                result = metrics(show_samples.STRATIFIED_JITTERED_SAMPLER, 4, points)
+
+                self.assertEqual(result["point count"], 32)
+                self.assertEqual(result["failed pass count"], 0)
+                self.assertEqual(result["evaluated pass count"], 2)
+                self.assertGreater(result["minimum distance"], 0)
+
+if __name__ == "__main__":
+
+        try:
+
+                if len(sys.argv) == 3 and sys.argv[1] == "validate":
+                        result = validate_file(sys.argv[2])
+                        print_metrics(result)
+                        if result["first failed pass"] is not None:
+                                error("Pass {0} is not stratified".format(result["first failed pass"]))
+                elif len(sys.argv) == 2:
+                        sampler_type, grid_size, points = show_samples.read_file(sys.argv[1])
+                        print_metrics(metrics(sampler_type, grid_size, points))
+                else:
+                        error("Usage: sampler_metrics.py [validate] sample_file")
+
+        except Exception as e:
+
+                sys.exit("{0}".format(e))
@@ -8,13 +8,29 @@
 #  (x, y) | (x, y, z)
 #  ...
 #  (x, y) | (x, y, z)
+#
+# show_samples.py [sample_file [first_pass [last_pass]]]
+# show_samples.py render png|svg output_directory "pattern" ...
 
 import sys
+import os
+import re
+import glob
+import time
+import itertools
 import ast
+import concurrent.futures
+import tempfile
+import types
+import unittest
 import tkinter as tk
 from tkinter import filedialog
 from tkinter import messagebox
+import numpy as np
 import matplotlib.pyplot as plt
+import matplotlib.collections
+import matplotlib.figure
+import matplotlib.backends.backend_agg
 import mpl_toolkits.mplot3d
 
 
@@ -22,6 +38,37 @@ STRATIFIED_JITTERED_SAMPLER = "Stratified Jittered Sampler"
 LATIN_HYPERCUBE_SAMPLER = "Latin Hypercube Sampler"
 PASS_COUNT_STRING = "Pass count:"
 
+# Наибольшее количество точек, показываемых отдельными точками.
+# При большем количестве на плоскости показывается плотность точек,
+# а в пространстве показывается случайная часть точек.
+MAX_SCATTER_POINTS_2D = 200000
+MAX_SCATTER_POINTS_3D = 50000
+
+# Количество интервалов по одному измерению при показе плотности точек,
+# примерно по одному на пиксель экрана
+DENSITY_BINS = 1000
+
+# Количество проходов при переходе клавишами PageUp и PageDown
+PASS_PAGE_SIZE = 100
+
+# Наибольшее количество делений сетки, при большем количестве
+# линии сетки ближе пикселей экрана и сетка не показывается
+MAX_GRID_SIZE = 500
+
+# Форматы файлов изображений при рисовании без окна
+IMAGE_FORMATS = ("png", "svg")
+
+# Примерное количество точек, читаемых за один раз при чтении файла
+# по проходам, округляется до целого количества проходов
+PASS_BLOCK_POINT_COUNT = 1024 * 1024
+
+# Размер части файла при подсчёте строк
+FILE_CHUNK_SIZE = 64 * 1024 * 1024
+
+# Координаты точки — всё между первой открывающей скобкой
+# и первой закрывающей скобкой после неё
+POINT_PATTERN = re.compile(r"^[^(\n]*\(([^)\n]*)\)", re.MULTILINE)
+
 if sys.version_info < (3, 6):
         sys.exit("Python >= 3.6 is required.")
 
@@ -31,53 +78,190 @@ class ShowSamplesException(Exception):
 def error(message):
         raise ShowSamplesException(message)
 
-def draw_line(ax, point_from, point_to):
+# Отрезки всех линий сетки (2 * (grid_size + 1), 2, 2)
+def grid_segments(grid_size):
+
+        positions = np.linspace(0, 1, grid_size + 1)
+
+        vertical = np.stack((np.stack((positions, np.zeros_like(positions)), axis = -1),
+                             np.stack((positions, np.ones_like(positions)), axis = -1)), axis = 1)
+
+        return np.concatenate((vertical, vertical[:, :, ::-1]))
+
+# Рисунок точек на сетке grid_size. Сетка и область рисунка создаются
+# один раз, а точки можно заменять, поэтому один объект используется
+# для многих наборов точек с одинаковыми сеткой и размерностью.
+class SamplesFigure:
+
+        def __init__(self, fig, grid_size, dimension):
+
+                if dimension not in (2, 3):
+                        error('Point dimension {0} is not supported'.format(dimension))
+
+                self.fig = fig
+                self.dimension = dimension
+                self.scatter = None
+                self.image = None
+
+                if dimension == 2:
+                        self.ax = fig.add_subplot(111)
+                        # Сетка под точками, но над изображением плотности
+                        if grid_size <= MAX_GRID_SIZE:
+                                self.ax.add_collection(matplotlib.collections.LineCollection(
+                                        grid_segments(grid_size), colors = 'gray', linestyles = 'solid',
+                                        linewidths = 0.5))
+                        self.scatter = self.ax.scatter(np.empty(0), np.empty(0), color = 'green', s = 4)
+                        # Как при автоматическом выборе границ по точкам от 0 до 1
+                        self.ax.set_xlim(-0.05, 1.05)
+                        self.ax.set_ylim(-0.05, 1.05)
+                else:
+                        self.ax = fig.add_subplot(111, projection='3d')
+                        self.scatter = self.ax.scatter(np.empty(0), np.empty(0), np.empty(0), c = 'green', marker = '.')
+                        # Координаты точек заменяются без автоматического выбора границ
+                        self.ax.set_xlim(0, 1)
+                        self.ax.set_ylim(0, 1)
+                        self.ax.set_zlim(0, 1)
+
+                self.ax.set_aspect('equal')
+
+        def __set_points_2d(self, points):
+
+                if len(points) <= MAX_SCATTER_POINTS_2D:
+                        self.scatter.set_offsets(points)
+                        if self.image is not None:
+                                self.image.set_visible(False)
+                        return False
+
+                self.scatter.set_offsets(np.empty((0, 2)))
+
+                density, _, _ = np.histogram2d(points[:, 0], points[:, 1], bins = DENSITY_BINS, range = [[0, 1], [0, 1]])
+
+                if self.image is None:
+                        self.image = self.ax.imshow(density.T, origin = 'lower', extent = (0, 1, 0, 1), cmap = 'Greens',
+                                                    interpolation = 'nearest', zorder = 0)
+                        self.ax.set_xlim(-0.05, 1.05)
+                        self.ax.set_ylim(-0.05, 1.05)
+                else:
+                        self.image.set_data(density.T)
+                        self.image.set_clim(0, np.max(density))
+                        self.image.set_visible(True)
+
+                return True
+
+        def __set_points_3d(self, points):
+
+                decimated = len(points) > MAX_SCATTER_POINTS_3D
+
+                if decimated:
+                        points = points[np.random.default_rng(0).choice(len(points), MAX_SCATTER_POINTS_3D,
+                                                                        replace = False)]
+
+                # У Path3DCollection нет открытой функции замены координат,
+                # кроме замены _offsets3d, как в примерах анимации matplotlib
+                self.scatter._offsets3d = (points[:, 0], points[:, 1], points[:, 2])
+                self.scatter.stale = True
+
+                return decimated
 
-        assert len(point_from) == 2 and len(point_to) == 2
+        # Заменить точки (N, 2) или (N, 3) и заголовок
+        def set_points(self, points, title):
 
-        ax.plot([point_from[0], point_to[0]], [point_from[1], point_to[1]],
-                color = 'gray', linestyle = 'solid', linewidth = 0.5)
+                points = np.asarray(points)
 
-def show_points_2d(ax, grid_size, points):
+                if len(points) == 0:
+                        error('No points to show')
 
-        assert len(points) > 0 and len(points[0]) == 2
+                if points.shape[1] != self.dimension:
+                        error('Point dimension {0} is not {1}'.format(points.shape[1], self.dimension))
 
-        for x in range(0, grid_size + 1):
-                draw_line(ax, (x / grid_size, 0), (x / grid_size, 1))
+                if self.dimension == 2:
+                        if self.__set_points_2d(points):
+                                title = "{0}, density of {1} points".format(title, len(points))
+                else:
+                        if self.__set_points_3d(points):
+                                title = "{0}, {1} of {2} points".format(title, MAX_SCATTER_POINTS_3D, len(points))
+
+                self.ax.set_title(title)
+
+# Показ одного прохода или интервала проходов. Границы проходов
+# offsets вычисляются один раз, при переходе к другим проходам
+# заменяются только точки рисунка.
+#  Up, Down — следующий и предыдущий проход,
+#  PageUp, PageDown — на PASS_PAGE_SIZE проходов вперёд и назад,
+#  a — все проходы.
+class PassView:
+
+        def __init__(self, figure, title, points, offsets):
 
-        for y in range(0, grid_size + 1):
-                draw_line(ax, (0, y / grid_size), (1, y / grid_size))
+                self.figure = figure
+                self.title = title
+                self.points = points
+                self.offsets = offsets
+                self.first = None
+                self.last = None
 
-        ax.scatter(*zip(*points), color = 'green', s = 4)
+        def pass_count(self):
 
-def show_points_3d(ax, points):
+                return len(self.offsets) - 1
 
-        assert len(points) > 0 and len(points[0]) == 3
+        # Проходы от first до last включительно, нумерация с 0.
+        # Без first показываются все проходы.
+        def show(self, first = None, last = None):
 
-        ax.scatter(*zip(*points), c = 'green', marker = '.')
+                pass_count = self.pass_count()
+
+                if first is None:
+                        first, last = 0, pass_count - 1
+                elif last is None:
+                        last = first
+
+                if not (0 <= first <= last < pass_count):
+                        error("Passes {0}-{1} out of 1-{2}".format(first + 1, last + 1, pass_count))
+
+                if first == 0 and last == pass_count - 1:
+                        title = self.title
+                elif first == last:
+                        title = "{0}, pass {1} of {2}".format(self.title, first + 1, pass_count)
+                else:
+                        title = "{0}, passes {1}-{2} of {3}".format(self.title, first + 1, last + 1, pass_count)
 
-def show_points(title, grid_size, points, window_title):
+                self.figure.set_points(self.points[self.offsets[first]:self.offsets[last + 1]], title)
+
+                self.first = first
+                self.last = last
+
+        def key_press(self, event):
+
+                steps = {"up": 1, "down": -1, "pageup": PASS_PAGE_SIZE, "pagedown": -PASS_PAGE_SIZE}
+
+                if event.key == "a":
+                        self.show()
+                elif event.key in steps:
+                        # Переход от нескольких проходов к первому из них
+                        # при движении вперёд и к последнему при движении назад
+                        if self.first != self.last:
+                                current = self.first if steps[event.key] > 0 else self.last
+                        else:
+                                current = (self.first + steps[event.key]) % self.pass_count()
+                        self.show(current)
+                else:
+                        return
 
-        if len(points) == 0:
-                error('No points to show')
+                self.figure.fig.canvas.draw_idle()
 
-        if len(points[0]) not in (2, 3):
-                error('Point dimension {0} is not supported'.format(len(points[0])))
+def show_points(sampler_type, grid_size, points, window_title, first_pass = None, last_pass = None):
 
         fig = plt.figure()
 
-        if len(points[0]) == 2:
-                ax = fig.add_subplot(111)
-                show_points_2d(ax, grid_size, points)
-        elif len(points[0]) == 3:
-                ax = fig.add_subplot(111, projection='3d')
-                show_points_3d(ax, points)
-        else:
-                assert False
+        if fig.canvas.manager is not None:
+                fig.canvas.manager.set_window_title(window_title)
+
+        view = PassView(SamplesFigure(fig, grid_size, points.shape[1]), sampler_type, points,
+                        pass_offsets(sampler_type, grid_size, points))
+
+        view.show(first_pass, last_pass)
 
-        ax.set_aspect('equal')
-        ax.set_title(title)
-        fig.canvas.set_window_title(window_title)
+        fig.canvas.mpl_connect("key_press_event", view.key_press)
 
         plt.show()
 
@@ -115,34 +299,82 @@ def parse_pass_count(text, keyword):
 
         return pass_count
 
-# Преобразование строки "*(x, y)*" в tuple(x, y)
-def parse_sampler_point(text):
+# Непустая строка текста
+NON_EMPTY_LINE_PATTERN = re.compile(r"^[^\S\n]*\S[^\n]*", re.MULTILINE)
+
+# Номер в файле и текст непустой строки с номером index
+# среди непустых строк text. text начинается со строки first_line_number.
+def non_empty_line(text, first_line_number, index):
+
+        for line_number, line in enumerate(text.split("\n"), first_line_number):
+                if line.strip() != "":
+                        if index == 0:
+                                return line_number, line.strip()
+                        index -= 1
+
+        assert False
+
+# Количество запятых в каждой строке text
+def comma_counts(text):
+
+        data = np.frombuffer(text.encode(), dtype = np.uint8)
+
+        commas = np.concatenate(([0], np.cumsum(data == ord(","))))
+        line_ends = np.append(np.flatnonzero(data == ord("\n")), len(data))
+
+        return np.diff(commas[line_ends], prepend = 0)
+
+# Преобразование строк "*(x, y)*" или "*(x, y, z)*" в массив (N, 2) или (N, 3)
+# сразу для всех непустых строк text. Текст text начинается со строки файла
+# first_line_number, сообщения об ошибках указывают на первую строку с ошибкой.
+def parse_sampler_points(text, first_line_number):
+
+        def line_error(message, index):
+                line_number, line = non_empty_line(text, first_line_number, index)
+                error("{0}, line {1}:\n{2}".format(message, line_number, line))
+
+        coordinates = POINT_PATTERN.findall(text)
+
+        line_count = len(NON_EMPTY_LINE_PATTERN.findall(text))
 
-        # Убрать всё из строки до первой открывающей скобки
-        # и после соответствующей ей закрывающей скобки
-        point_begin = text.find("(")
-        if point_begin < 0:
-                error("Malformed input:\n{0}".format(text))
-        point_end = text.find(")", point_begin)
-        if point_end < 0:
-                error("Malformed input:\n{0}".format(text))
-        text = text[point_begin : point_end + 1]
+        if line_count == 0:
+                error("No points")
+
+        if len(coordinates) != line_count:
+                for i, line in enumerate(NON_EMPTY_LINE_PATTERN.findall(text)):
+                        if POINT_PATTERN.match(line) is None:
+                                line_error("Malformed input", i)
+                assert False
+
+        coordinates = "\n".join(coordinates)
+
+        dimensions = comma_counts(coordinates) + 1
+
+        if dimensions[0] < 2:
+                line_error("Not tuple input", 0)
+
+        inconsistent = np.flatnonzero(dimensions != dimensions[0])
+        if len(inconsistent) > 0:
+                i = inconsistent[0]
+                line_error("Inconsistent point dimensions {0} and {1}".format(dimensions[0], dimensions[i]), i)
 
         try:
-                point = ast.literal_eval(text)
+                points = np.array(coordinates.replace("\n", ",").split(","), dtype = np.float64)
         except ValueError:
-                error("Malformed input:\n{0}".format(text))
+                for i, c in enumerate(coordinates.split("\n")):
+                        try:
+                                np.array(c.split(","), dtype = np.float64)
+                        except ValueError:
+                                line_error("Not point input", i)
+                assert False
 
-        if not isinstance(point, tuple):
-                error("Not tuple input:\n{0}".format(text))
+        points = points.reshape(-1, dimensions[0])
 
-        for coordinate in point:
-                if not isinstance(coordinate, (int, float)):
-                        error("Not point input:\n{0}".format(text))
-                if not (coordinate >= 0 and coordinate <= 1):
-                        error("Point coordinates out of [0, 1]:\n{0}".format(text))
+        out_of_range = np.flatnonzero(~np.all((points >= 0) & (points <= 1), axis = 1))
+        if len(out_of_range) > 0:
+                line_error("Point coordinates out of [0, 1]", out_of_range[0])
 
-        return point
+        return points
 
 # Количество делений квадрата по одному измерению в зависимости от типа семплера
 def compute_grid_size(sampler_type, point_count, pass_count, dimension):
@@ -173,55 +405,173 @@ def compute_grid_size(sampler_type, point_count, pass_count, dimension):
 
         return int(grid_size)
 
+# Количество точек одного прохода
+def group_size(sampler_type, grid_size, dimension):
+
+        if sampler_type == STRATIFIED_JITTERED_SAMPLER:
+                return grid_size ** dimension
+
+        if sampler_type == LATIN_HYPERCUBE_SAMPLER:
+                return grid_size
+
+        error("Error sampler type \"{0}\"".format(sampler_type))
+
+# Границы проходов в массиве точек (N, d): точки прохода i —
+# points[offsets[i]:offsets[i + 1]]
+def pass_offsets(sampler_type, grid_size, points):
+
+        size = group_size(sampler_type, grid_size, points.shape[1])
+
+        if len(points) % size != 0:
+                error("Point count {0} is not a multiple of pass size {1}".format(len(points), size))
+
+        return np.arange(0, len(points) + 1, size)
+
 # Возвращаемое значение
-# (название семплера, количество делений квадрата по одному измерению, координаты точек)
+# (название семплера, количество делений квадрата по одному измерению, координаты точек (N, d))
 def read_file(file_name):
 
         samplers = [STRATIFIED_JITTERED_SAMPLER, LATIN_HYPERCUBE_SAMPLER]
 
-        sampler_type = ""
-        pass_count = -1
-        grid_size = -1
-        point_list = []
+        with open(file_name) as f:
+                text = f.read()
+
+        # Первые две непустые строки — тип семплера и количество проходов
+        header = list(itertools.islice(NON_EMPTY_LINE_PATTERN.finditer(text), 2))
 
-        line_num = 0
+        if len(header) < 1:
+                error("No sampler type")
 
-        dimension = -1
+        sampler_type = parse_sampler_type(header[0].group().strip(), samplers)
 
-        for line in open(file_name):
+        if len(header) < 2:
+                error("\"" + PASS_COUNT_STRING + "\" not found")
 
-                line = line.strip()
+        pass_count = parse_pass_count(header[1].group().strip(), PASS_COUNT_STRING)
 
-                if line == "":
-                        continue
+        # Точки после строки количества проходов
+        points_begin = header[1].end()
 
-                if line_num == 0:
-                        sampler_type = parse_sampler_type(line, samplers)
-                elif line_num == 1:
-                        pass_count = parse_pass_count(line, PASS_COUNT_STRING)
-                else:
-                        point = parse_sampler_point(line)
+        points = parse_sampler_points(text[points_begin:], text.count("\n", 0, points_begin) + 1)
 
-                        if dimension > 0:
-                                if len(point) != dimension:
-                                        error("Inconsistent point dimensions {0} and {1}".format(dimension, len(point)))
-                        else:
-                                dimension = len(point)
+        grid_size = compute_grid_size(sampler_type, len(points), pass_count, points.shape[1])
 
-                        point_list.append(point)
+        return (sampler_type, grid_size, points)
 
-                line_num += 1
+# Количество непустых строк файла. Файл читается частями,
+# поэтому память не зависит от размера файла.
+def count_non_empty_lines(file_name):
 
-        if sampler_type == "":
+        pattern = re.compile(rb"^[^\S\n]*\S", re.MULTILINE)
+
+        count = 0
+        rest = b""
+
+        with open(file_name, "rb") as f:
+
+                while True:
+
+                        data = f.read(FILE_CHUNK_SIZE)
+
+                        if len(data) == 0:
+                                break
+
+                        data = rest + data
+                        end = data.rfind(b"\n") + 1
+                        rest = data[end:]
+
+                        count += len(pattern.findall(data, 0, end))
+
+        return count + len(pattern.findall(rest))
+
+# Номера с 1 и строки файла, только непустые
+def non_empty_lines(f):
+
+        for line_number, line in enumerate(f, 1):
+                if line.strip() != "":
+                        yield line_number, line
+
+# Чтение файла по проходам. Сначала подсчитываются строки файла, чтобы
+# найти размер прохода, затем точки читаются блоками по целому
+# количеству проходов, примерно по block_point_count точек, поэтому
+# память не зависит от размера файла. Проверяются до подсчёта только
+# тип семплера, количество проходов и первая точка, а подсчёт строк
+# читает весь файл, поэтому ошибки в остальных точках обнаруживаются
+# только после этого полного прохода по файлу, при чтении их блока.
+# Возвращаемое значение
+# (название семплера, количество делений квадрата по одному измерению,
+#  количество точек в проходе, генератор блоков точек (n, d))
+def read_passes(file_name, block_point_count = PASS_BLOCK_POINT_COUNT):
+
+        samplers = [STRATIFIED_JITTERED_SAMPLER, LATIN_HYPERCUBE_SAMPLER]
+
+        with open(file_name) as f:
+                lines = list(itertools.islice(non_empty_lines(f), 3))
+
+        if len(lines) < 1:
                 error("No sampler type")
-        if len(point_list) < 1:
+
+        sampler_type = parse_sampler_type(lines[0][1].strip(), samplers)
+
+        if len(lines) < 2:
+                error("\"" + PASS_COUNT_STRING + "\" not found")
+
+        pass_count = parse_pass_count(lines[1][1].strip(), PASS_COUNT_STRING)
+
+        if len(lines) < 3:
                 error("No points")
-        if dimension < 1:
-                error("No dimension")
 
-        grid_size = compute_grid_size(sampler_type, len(point_list), pass_count, dimension)
+        dimension = parse_sampler_points(lines[2][1], lines[2][0]).shape[1]
+
+        point_count = count_non_empty_lines(file_name) - 2
+
+        grid_size = compute_grid_size(sampler_type, point_count, pass_count, dimension)
+
+        pass_size = point_count // pass_count
+
+        block_size = max(1, block_point_count // pass_size) * pass_size
+
+        def parse_block(text, first_line_number):
+
+                points = parse_sampler_points(text, first_line_number)
+
+                if points.shape[1] != dimension:
+                        line_number, line = non_empty_line(text, first_line_number, 0)
+                        error("Inconsistent point dimensions {0} and {1}, line {2}:\n{3}"\
+                              .format(dimension, points.shape[1], line_number, line))
+
+                return points
+
+        def blocks():
+
+                with open(file_name) as f:
+
+                        block = []
+                        block_point_count = 0
+                        first_line_number = lines[1][0] + 1
+
+                        for line_number, line in enumerate(f, 1):
+
+                                if line_number < first_line_number:
+                                        continue
+
+                                block.append(line)
+
+                                if line.strip() == "":
+                                        continue
+
+                                block_point_count += 1
+
+                                if block_point_count == block_size:
+                                        yield parse_block("".join(block), first_line_number)
+                                        block = []
+                                        block_point_count = 0
+                                        first_line_number = line_number + 1
 
-        return (sampler_type, grid_size, point_list)
+                        if block_point_count > 0:
+                                yield parse_block("".join(block), first_line_number)
+
+        return sampler_type, grid_size, pass_size, blocks()
 
 def dialog():
 
@@ -245,12 +595,390 @@ def dialog():
                 top.destroy()
                 raise
 
+# Имена файлов изображений. Пути файлов точек относительно их общего
+# каталога повторяются в output_directory, чтобы файлы с одинаковыми
+# именами из разных каталогов не перезаписывали изображения друг друга.
+def output_file_names(file_names, output_directory, image_format):
+
+        directories = [os.path.dirname(os.path.abspath(file_name)) for file_name in file_names]
+        common_directory = os.path.commonpath(directories) if len(directories) > 0 else ""
+
+        output_files = []
+        sources = {}
+
+        for file_name in file_names:
+
+                relative_name = os.path.relpath(os.path.abspath(file_name), common_directory)
+                output_file = os.path.join(output_directory, os.path.splitext(relative_name)[0] + "." + image_format)
+
+                key = os.path.normcase(os.path.abspath(output_file))
+                if key in sources:
+                        error("Files \"{0}\" and \"{1}\" have the same image file \"{2}\"".format(
+                                sources[key], file_name, output_file))
+                sources[key] = file_name
+
+                output_files.append(output_file)
+
+        return output_files
+
+# Рисунки файлов точек в одном процессе без окна и без pyplot.
+# Рисунок с сеткой создаётся один раз для каждого сочетания
+# размера сетки и размерности, для следующих файлов заменяются
+# только точки и заголовок.
+def render_sample_files(file_names, output_files, image_format):
+
+        figures = {}
+
+        results = []
+
+        for file_name, output_file in zip(file_names, output_files):
+
+                result = {"file": file_name, "output": output_file, "read time": 0.0, "render time": 0.0}
+
+                try:
+                        start = time.perf_counter()
+                        sampler_type, grid_size, points = read_file(file_name)
+                        result["read time"] = time.perf_counter() - start
+
+                        start = time.perf_counter()
+
+                        key = (grid_size, points.shape[1])
+                        if key not in figures:
+                                fig = matplotlib.figure.Figure()
+                                matplotlib.backends.backend_agg.FigureCanvasAgg(fig)
+                                figures[key] = SamplesFigure(fig, grid_size, points.shape[1])
+
+                        figure = figures[key]
+                        figure.set_points(points, sampler_type)
+                        os.makedirs(os.path.dirname(output_file), exist_ok = True)
+                        figure.fig.savefig(output_file, format = image_format)
+
+                        result["render time"] = time.perf_counter() - start
+                        result["points"] = len(points)
+                        result["status"] = "done"
+
+                except (ShowSamplesException, OSError, ValueError) as e:
+                        result["status"] = "error"
+                        result["message"] = "{0}".format(e)
+
+                results.append(result)
+
+        return results
+
+# Рисунки файлов точек в файлах изображений в нескольких процессах.
+# Каждый процесс получает подряд идущую часть файлов.
+def render_files(file_names, output_directory, image_format = "png", process_count = None):
+
+        if image_format not in IMAGE_FORMATS:
+                error("Unknown image format \"{0}\"".format(image_format))
+
+        output_files = output_file_names(file_names, output_directory, image_format)
+
+        os.makedirs(output_directory, exist_ok = True)
+
+        if process_count is None:
+                process_count = os.cpu_count() or 1
+
+        process_count = max(1, min(process_count, len(file_names)))
+
+        if process_count == 1:
+                return render_sample_files(file_names, output_files, image_format)
+
+        # Соседние файлы часто имеют одинаковый размер сетки,
+        # поэтому их рисунки используются повторно в одном процессе
+        bounds = [len(file_names) * i // process_count for i in range(process_count + 1)]
+        parts = [file_names[begin:end] for begin, end in zip(bounds[:-1], bounds[1:])]
+        output_parts = [output_files[begin:end] for begin, end in zip(bounds[:-1], bounds[1:])]
+
+        with concurrent.futures.ProcessPoolExecutor(max_workers = process_count) as executor:
+                part_results = executor.map(render_sample_files, parts, output_parts, itertools.repeat(image_format))
+
+                # Результаты в порядке файлов
+                return list(itertools.chain.from_iterable(part_results))
+
+def render_report(results, time_all):
+
+        lines = ["{0:<7} {1:>9} {2:>9} {3:>10}  {4}".format("status", "read, s", "render, s", "points", "file")]
+
+        for result in results:
+                lines.append("{0:<7} {1:>9.3f} {2:>9.3f} {3:>10}  {4}".format(
+                        result["status"], result["read time"], result["render time"], result.get("points", ""),
+                        result["output"]))
+                if "message" in result:
+                        lines.append("        {0}: {1}".format(result["file"], result["message"]))
+
+        done = sum(1 for result in results if result["status"] == "done")
+
+        lines.append("\n{0} files: {1} done, {2} error, time {3:.3f} s".format(
+                len(results), done, len(results) - done, time_all))
+
+        return "\n".join(lines)
+
+# render png|svg output_directory "pattern" ...
+def run_render(argv):
+
+        if len(argv) < 3:
+                error("Usage: render png|svg output_directory \"pattern\" ...")
+
+        file_names = sorted(set(itertools.chain.from_iterable(glob.glob(pattern) for pattern in argv[2:])))
+
+        if len(file_names) == 0:
+                error("No files match \"{0}\"".format(" ".join(argv[2:])))
+
+        start = time.perf_counter()
+
+        results = render_files(file_names, argv[1], argv[0])
+
+        print(render_report(results, time.perf_counter() - start))
+
+        if any(result["status"] == "error" for result in results):
+                error("Not all files are rendered")
+
+# Номер прохода из командной строки, нумерация с 1
+def get_pass_number(text):
+
+        try:
+                number = int(text)
+        except ValueError:
+                error("Error pass number \"{0}\" conversion to integer".format(text))
+
+        if number <= 0:
+                error("Pass number must be positive")
+
+        return number - 1
+
+class ShowSamplesTestCase(unittest.TestCase):
+
+        @staticmethod
+        def write_file(text):
+
+                with tempfile.NamedTemporaryFile("w", suffix = ".txt", delete = False) as f:
+                        f.write(text)
+                        return f.name
+
+        def read_text(self, text):
+
+                file_name = self.write_file(text)
+
+                try:
+                        return read_file(file_name)
+                finally:
+                        os.remove(file_name)
+
+        def test_read_file(self):
+
+                sampler_type, grid_size, points = self.read_text(
+                        "Stratified Jittered Sampler\n\nPass count: 1\n"
+                        "(0.1, 0.2)\n  (0.3,0.4)  \n\n1: (1, 0)\n(0, 1e-1) # 4\n")
+
+                self.assertEqual(sampler_type, STRATIFIED_JITTERED_SAMPLER)
+                self.assertEqual(grid_size, 2)
+                self.assertTrue(np.array_equal(points, [[0.1, 0.2], [0.3, 0.4], [1, 0], [0, 0.1]]))
+
+                sampler_type, grid_size, points = self.read_text(
+                        "Latin Hypercube Sampler\nPass count: 1\n(0.1, 0.2, 0.3)\n(0.4, 0.5, 0.6)\n")
+
+                self.assertEqual(grid_size, 2)
+                self.assertEqual(points.shape, (2, 3))
+
+        def test_read_errors(self):
+
+                header = "Latin Hypercube Sampler\nPass count: 1\n"
+
+                texts = {"(0.1, 0.2)\n\n0.1, 0.2\n": "Malformed input, line 5:\n0.1, 0.2",
+                         "(0.1, 0.2)\n(0.1, 0.2, 0.3)\n": "Inconsistent point dimensions 2 and 3, line 4:\n(0.1, 0.2, 0.3)",
+                         "(0.1)\n": "Not tuple input, line 3:\n(0.1)",
+                         "(0.1, 0.2)\n(0.1, a)\n": "Not point input, line 4:\n(0.1, a)",
+                         "(0.1, 0.2)\n(0.1, 0.2)\n(0.1, 1.5)\n(2, 0.2)\n":
+                         "Point coordinates out of [0, 1], line 5:\n(0.1, 1.5)",
+                         "": "No points"}
+
+                for text, message in texts.items():
+
+                        with self.assertRaises(ShowSamplesException) as context:
+                                self.read_text(header + text)
+
+                        self.assertEqual(str(context.exception), message)
+
+        @staticmethod
+        def create_figure(grid_size, points):
+
+                fig = matplotlib.figure.Figure()
+                matplotlib.backends.backend_agg.FigureCanvasAgg(fig)
+
+                SamplesFigure(fig, grid_size, points.shape[1]).set_points(points, "Title")
+
+                return fig
+
+        def test_figure(self):
+
+                for point_count in (100, MAX_SCATTER_POINTS_2D + 1):
+
+                        fig = self.create_figure(10, np.random.default_rng(1).random((point_count, 2)))
+
+                        ax = fig.axes[0]
+
+                        self.assertIsInstance(ax.collections[0], matplotlib.collections.LineCollection)
+                        self.assertEqual(len(ax.collections[0].get_segments()), 22)
+                        self.assertEqual(len(ax.images), 0 if point_count <= MAX_SCATTER_POINTS_2D else 1)
+
+                fig = self.create_figure(MAX_GRID_SIZE + 1, np.random.default_rng(1).random((10, 2)))
+                self.assertEqual(len(fig.axes[0].collections), 1)
+                self.assertNotIsInstance(fig.axes[0].collections[0], matplotlib.collections.LineCollection)
+
+                fig = self.create_figure(1, np.random.default_rng(1).random((MAX_SCATTER_POINTS_3D + 1, 3)))
+                self.assertEqual(len(fig.axes[0].collections[0]._offsets3d[0]), MAX_SCATTER_POINTS_3D)
+
+        def test_passes(self):
+
+                points = np.random.default_rng(1).random((12, 2))
+
+                offsets = pass_offsets(STRATIFIED_JITTERED_SAMPLER, 2, points)
+                self.assertTrue(np.array_equal(offsets, [0, 4, 8, 12]))
+                self.assertTrue(np.array_equal(pass_offsets(LATIN_HYPERCUBE_SAMPLER, 6, points), [0, 6, 12]))
+
+                with self.assertRaises(ShowSamplesException):
+                        pass_offsets(LATIN_HYPERCUBE_SAMPLER, 5, points)
+
+                fig = matplotlib.figure.Figure()
+                matplotlib.backends.backend_agg.FigureCanvasAgg(fig)
+
+                figure = SamplesFigure(fig, 2, 2)
+                view = PassView(figure, "Title", points, offsets)
+                scatter = figure.scatter
+
+                view.show()
+                self.assertEqual(figure.ax.get_title(), "Title")
+                self.assertEqual(len(scatter.get_offsets()), 12)
+
+                def key(name):
+                        view.key_press(types.SimpleNamespace(key = name))
+                        return (view.first, view.last, figure.ax.get_title())
+
+                self.assertEqual(key("up"), (0, 0, "Title, pass 1 of 3"))
+                self.assertTrue(np.array_equal(scatter.get_offsets(), points[0:4]))
+                self.assertEqual(key("down"), (2, 2, "Title, pass 3 of 3"))
+                self.assertTrue(np.array_equal(scatter.get_offsets(), points[8:12]))
+                self.assertEqual(key("up"), (0, 0, "Title, pass 1 of 3"))
+                self.assertEqual(key("pagedown")[0], (0 - PASS_PAGE_SIZE) % 3)
+                self.assertEqual(key("a"), (0, 2, "Title"))
+
+                view.show(1, 2)
+                self.assertEqual(figure.ax.get_title(), "Title, passes 2-3 of 3")
+                self.assertTrue(np.array_equal(scatter.get_offsets(), points[4:12]))
+
+                # Точки заменяются в том же объекте рисунка
+                self.assertIs(figure.scatter, scatter)
+                self.assertEqual(len(figure.ax.collections), 2)
+
+                with self.assertRaises(ShowSamplesException) as context:
+                        view.show(2, 3)
+                self.assertEqual(str(context.exception), "Passes 3-4 out of 1-3")
+
+                # От нескольких проходов к первому или последнему из них
+                view.show(1, 2)
+                self.assertEqual(key("up"), (1, 1, "Title, pass 2 of 3"))
+                view.show(0, 1)
+                self.assertEqual(key("down"), (1, 1, "Title, pass 2 of 3"))
+
+                points = np.random.default_rng(1).random((8, 3))
+
+                figure = SamplesFigure(fig, 1, 3)
+                view = PassView(figure, "Title", points, pass_offsets(LATIN_HYPERCUBE_SAMPLER, 4, points))
+                scatter = figure.scatter
+
+                view.show(1)
+                self.assertIs(figure.scatter, scatter)
+                self.assertTrue(np.array_equal(np.column_stack(scatter._offsets3d), points[4:8]))
+
+        def test_read_passes(self):
+
+                points = np.random.default_rng(1).random((24, 2))
+
+                text = "Latin Hypercube Sampler\n\nPass count: 6\n" + "".join(
+                        "({0}, {1})\n{2}".format(x, y, "\n" if i % 5 == 0 else "") for i, (x, y) in enumerate(points))
+
+                file_name = self.write_file(text)
+
+                try:
+                        sampler_type, grid_size, pass_size, blocks = read_passes(file_name, 10)
+                        blocks = list(blocks)
+                finally:
+                        os.remove(file_name)
+
+                self.assertEqual((sampler_type, grid_size, pass_size), (LATIN_HYPERCUBE_SAMPLER, 4, 4))
+                self.assertEqual([len(block) for block in blocks], [8, 8, 8])
+                self.assertTrue(np.array_equal(np.concatenate(blocks), points))
+
+                text = "Latin Hypercube Sampler\nPass count: 2\n(0.1, 0.2)\n(0.1, 0.2)\n\n(0.1, 0.2, 0.3)\n(0.1, 0.2, 0.3)\n"
+
+                file_name = self.write_file(text)
+
+                try:
+                        sampler_type, grid_size, pass_size, blocks = read_passes(file_name, 1)
+                        self.assertEqual(len(next(blocks)), 2)
+                        with self.assertRaises(ShowSamplesException) as context:
+                                next(blocks)
+                finally:
+                        os.remove(file_name)
+
+                self.assertEqual(str(context.exception), "Inconsistent point dimensions 2 and 3, line 6:\n(0.1, 0.2, 0.3)")
+
+        def test_render(self):
+
+                texts = ["Latin Hypercube Sampler\nPass count: 1\n(0.1, 0.2)\n(0.6, 0.7)\n",
+                         "Latin Hypercube Sampler\nPass count: 1\n(0.3, 0.8)\n(0.9, 0.1)\n",
+                         "Latin Hypercube Sampler\nPass count: 1\n(0.1, 0.2, 0.3)\n(0.4, 0.5, 0.6)\n",
+                         "Latin Hypercube Sampler\nPass count: 1\n(0.1, 2)\n"]
+
+                file_names = [self.write_file(text) for text in texts]
+
+                try:
+                        with tempfile.TemporaryDirectory() as directory:
+
+                                for image_format in IMAGE_FORMATS:
+
+                                        results = render_files(file_names, directory, image_format, process_count = 1)
+
+                                        self.assertEqual([result["file"] for result in results], file_names)
+                                        self.assertEqual([result["status"] for result in results],
+                                                         ["done", "done", "done", "error"])
+
+                                        for result in results[:3]:
+                                                self.assertTrue(os.path.getsize(result["output"]) > 0)
+                                                self.assertTrue(result["output"].endswith("." + image_format))
+
+                                        self.assertFalse(os.path.exists(results[3]["output"]))
+                                        self.assertIn("out of [0, 1]", results[3]["message"])
+                finally:
+                        for file_name in file_names:
+                                os.remove(file_name)
+
+        def test_output_file_names(self):
+
+                file_names = [os.path.join("samples", "a", "points.txt"), os.path.join("samples", "b", "points.txt"),
+                              os.path.join("samples", "points.txt")]
+
+                self.assertEqual(output_file_names(file_names, "images", "png"),
+                                 [os.path.join("images", "a", "points.png"), os.path.join("images", "b", "points.png"),
+                                  os.path.join("images", "points.png")])
+
+                self.assertEqual(output_file_names([os.path.join("samples", "points.txt")], "images", "svg"),
+                                 [os.path.join("images", "points.svg")])
+
+                with self.assertRaises(ShowSamplesException):
+                        output_file_names([os.path.join("samples", "points.txt"), os.path.join("samples", "points.dat")],
+                                          "images", "png")
+
 if __name__ == "__main__":
 
         try:
 
-                if len(sys.argv) == 2:
-                        show_points(*read_file(sys.argv[1]), "Sampler points")
+                if len(sys.argv) > 1 and sys.argv[1] == "render":
+                        run_render(sys.argv[2:])
+                elif 2 <= len(sys.argv) <= 4:
+                        passes = [get_pass_number(text) for text in sys.argv[2:]]
+                        show_points(*read_file(sys.argv[1]), "Sampler points", *passes)
                 else:
                         dialog()
 